@@ -1,13 +1,22 @@
+import time
+
 from flask import Flask
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from config import Config
+from cache import response_cache
+from auth import token_cache
+from contact_queue import contact_queue
+from metrics import metrics
+from compression import compressor
+import database
 
 # Initialize extensions
 cors = CORS()
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': database.RoutingSession})
 
 def create_app():
+    boot_started = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(Config)
     # Allow CORS for frontend (local and deployed admin)
@@ -18,16 +27,46 @@ def create_app():
         "https://brian-kimathi-portfolio.vercel.app",  # Add this
         "https://brian-kimathi.vercel.app"
     ], supports_credentials=True)
+    database.configure(app)
     db.init_app(app)
+    database.install(app, db)
+    response_cache.init_app(app)
+    token_cache.init_app(app)
+    contact_queue.init_app(app)
+    from inbox import contact_inbox
+    contact_inbox.init_app(app)
+    from jobs import job_runner
+    job_runner.init_app(app)
+    metrics.init_app(app)
+    # Registered after metrics so response sizes are recorded as sent
+    compressor.init_app(app)
+
+    import storage
+    storage.init_app(app)
+    import serializers
+    serializers.init_app(app)
 
-    # Import all models before creating tables
-    from models import User, Project, ProjectImage, Skill, Experience, Education, Contact
+    # Importing the routes loads every model and handler module now rather
+    # than on a worker's first request
+    from routes import api_bp
+    from schema import prepare_database
 
     with app.app_context():
-        db.create_all()
+        schema_state = prepare_database(app.config['SCHEMA_CHECK'])
+    # Messages spooled by a previous shutdown or failed flush
+    contact_queue.replay_spool()
 
-    # Import and register blueprints here
-    from routes import api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
 
+    from commands import register_commands
+    register_commands(app)
+
+    from storage import start_gc_scheduler
+    start_gc_scheduler(app)
+
+    from snapshot import snapshot_exporter
+    snapshot_exporter.init_app(app)
+
+    database.prepare_fork(app, db)
+    metrics.mark_started(boot_started, schema_state)
     return app 
@@ -0,0 +1,86 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Commits to these tables (user edits, revocations) invalidate every cached
+# principal. The versions come from the response cache's stamp files, so a
+# logout or password change in one worker revokes the token in all of them.
+AUTH_TAGS = ('user', 'revoked_token')
+
+
+class _Principal:
+    __slots__ = ('user_id', 'payload', 'expires_at', 'versions')
+
+    def __init__(self, user_id, payload, expires_at, versions):
+        self.user_id = user_id
+        self.payload = payload
+        self.expires_at = expires_at
+        self.versions = versions
+
+
+# Bounded TTL cache of verified admin tokens. An entry never outlives the
+# token's own exp claim. Without stamp files a revocation would only reach the
+# worker that made it, so the cache is then disabled.
+class TokenCache:
+
+    def __init__(self, app=None):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = 1024
+        self.ttl = 300
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('AUTH_CACHE_MAX_ENTRIES', self.max_entries)
+        self.ttl = app.config.get('AUTH_CACHE_TTL', self.ttl)
+        if self.ttl > 0 and not response_cache.stamp_dir:
+            logger.warning('Response cache stamps are unavailable; admin tokens are verified on every request')
+            self.ttl = 0
+        app.extensions['token_cache'] = self
+
+    def get(self, token):
+        if self.ttl <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                if entry.expires_at <= now or entry.versions != response_cache.versions(AUTH_TAGS):
+                    del self._entries[token]
+                    entry = None
+                else:
+                    self._entries.move_to_end(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, token, user_id, payload, versions):
+        entry = _Principal(user_id, payload, min(time.time() + self.ttl, payload['exp']), versions)
+        if self.ttl <= 0:
+            return entry
+        with self._lock:
+            self._entries[token] = entry
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache()
@@ -0,0 +1,230 @@
+import fnmatch
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import click
+
+from .seed import APP_DIR, SCALES, prepare_workdir
+
+THRESHOLD_OPTIONS = [
+    click.option('--max-latency-regression', type=float, default=0.25, show_default=True,
+                 help='Allowed relative p95 latency increase.'),
+    click.option('--max-throughput-drop', type=float, default=0.20, show_default=True,
+                 help='Allowed relative throughput decrease.'),
+    click.option('--max-query-increase', type=float, default=0.0, show_default=True,
+                 help='Allowed increase in queries per request.'),
+    click.option('--min-latency-delta-ms', type=float, default=1.0, show_default=True,
+                 help='Ignore latency changes smaller than this.'),
+]
+
+
+def threshold_options(f):
+    for option in reversed(THRESHOLD_OPTIONS):
+        f = option(f)
+    return f
+
+
+def report(baseline, current, thresholds):
+    from .runner import compare
+    rows, failures = compare(baseline, current, **thresholds)
+    for name, transport, old, new, problems in rows:
+        status = 'FAIL' if problems else 'ok'
+        click.echo(f"[{status:4}] {transport:12} {name:48} p95 {old['p95_ms']:8.2f} -> {new['p95_ms']:8.2f} ms  "
+                   f"q/req {old['queries_per_request']:5.1f} -> {new['queries_per_request']:5.1f}")
+        for problem in problems:
+            click.echo(f"         {problem}")
+    click.echo(f"{len(failures)} regressions in {len(rows)} comparisons")
+    return not failures
+
+
+# Runs in a fresh interpreter: import, create_app() and one request, timed
+COLDSTART_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from __init__ import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+status = app.test_client().get(sys.argv[2]).status_code
+done = time.perf_counter()
+from metrics import metrics
+print(json.dumps({'import_ms': (imported - start) * 1000, 'create_app_ms': (created - imported) * 1000,
+                  'first_request_ms': (done - created) * 1000, 'total_ms': (done - start) * 1000,
+                  'status': status, 'schema': metrics.schema_state}))
+'''
+
+
+@click.group()
+def cli():
+    """Seed a synthetic database and benchmark every API route."""
+
+
+@cli.command()
+@click.option('--scale', type=click.Choice(sorted(SCALES)), default='small', show_default=True)
+@click.option('--contacts', type=int, default=None, help='Override the number of seeded contacts.')
+@click.option('--mode', type=click.Choice(['client', 'server', 'both']), default='both', show_default=True,
+              help='Flask test client, threaded WSGI server, or both.')
+@click.option('--requests', 'n_requests', type=int, default=200, show_default=True, help='Requests per route.')
+@click.option('--concurrency', type=int, default=8, show_default=True, help='Client threads.')
+@click.option('--warmup', type=int, default=5, show_default=True, help='Untimed requests per route.')
+@click.option('--only', multiple=True, help='Glob over scenario names, e.g. "GET /api/projects*".')
+@click.option('--no-response-cache', is_flag=True, help='Disable the response cache for the run.')
+@click.option('--accept-encoding', default='', help='Accept-Encoding sent with every request, e.g. "gzip, br".')
+@click.option('--seed', 'seed_value', type=int, default=1, show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), default='bench-results.json', show_default=True)
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Fail on regressions against this run.')
+@click.option('--workdir', type=click.Path(file_okay=False), help='Keep the database and uploads here.')
+@threshold_options
+def run(scale, contacts, mode, n_requests, concurrency, warmup, only, no_response_cache, accept_encoding, seed_value, output,
+        baseline, workdir, **thresholds):
+    """Seed a fresh database, run every scenario and save the results."""
+    sizes = dict(SCALES[scale])
+    if contacts is not None:
+        sizes['contacts'] = contacts
+    workdir, keep = prepare_workdir(workdir, response_cache=not no_response_cache)
+    from __init__ import create_app
+    from .runner import TestClientTransport, ServerTransport, instrument, metadata, run as run_all, save
+    from .scenarios import Context, scenarios, uncovered
+    from .seed import seed
+
+    app = create_app()
+    try:
+        with app.app_context():
+            click.echo(f"Seeding {scale} database: {sizes}")
+            seed(sizes, seed_value)
+        instrument(app)
+        ctx = Context(app, seed_value)
+        selected = [s for s in scenarios() if not only or any(fnmatch.fnmatch(s.name, p) for p in only)]
+        if not only:
+            for missing in uncovered(app, selected):
+                click.echo(f"Not covered: {missing}")
+        transports = []
+        if mode in ('client', 'both'):
+            transports.append(TestClientTransport(app))
+        if mode in ('server', 'both'):
+            transports.append(ServerTransport(app))
+        try:
+            headers = {'Accept-Encoding': accept_encoding} if accept_encoding else None
+            results = run_all(app, ctx, selected, transports, n_requests, concurrency, warmup, log=click.echo,
+                              headers=headers)
+        finally:
+            for transport in transports:
+                transport.close()
+        options = {'scale': scale, 'sizes': sizes, 'mode': mode, 'requests': n_requests,
+                   'concurrency': concurrency, 'warmup': warmup, 'response_cache': not no_response_cache,
+                   'accept_encoding': accept_encoding, 'seed': seed_value, 'only': list(only)}
+        current = {'meta': metadata(options), 'results': results}
+        save(output, current['meta'], results)
+        click.echo(f"Saved results to {output}")
+    finally:
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = any(r['errors'] for transports in results.values() for r in transports.values())
+    if failed:
+        click.echo('Some requests returned unexpected statuses')
+    if baseline:
+        with open(baseline) as f:
+            failed = not report(json.load(f), current, thresholds) or failed
+    if failed:
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.option('--scale', type=click.Choice(sorted(SCALES)), default='small', show_default=True)
+@click.option('--runs', type=int, default=5, show_default=True)
+@click.option('--path', default='/api/portfolio', show_default=True, help='First request each process serves.')
+@click.option('--schema-check', type=click.Choice(['auto', 'always', 'skip']), default='auto', show_default=True)
+@click.option('--workdir', type=click.Path(file_okay=False), help='Keep the database and uploads here.')
+def coldstart(scale, runs, path, schema_check, workdir):
+    """Time fresh worker processes from interpreter start to the first response."""
+    workdir, keep = prepare_workdir(workdir)
+    from __init__ import create_app
+    from .seed import seed
+
+    try:
+        with create_app().app_context():
+            seed(SCALES[scale])
+        env = dict(os.environ, SCHEMA_CHECK=schema_check)
+        samples = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, '-c', COLDSTART_PROBE, APP_DIR, path], env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            sample = json.loads(output.strip().splitlines()[-1])
+            samples.append(sample)
+            click.echo(f"import {sample['import_ms']:7.1f} ms  create_app {sample['create_app_ms']:7.1f} ms  "
+                       f"first request {sample['first_request_ms']:7.1f} ms  total {sample['total_ms']:7.1f} ms  "
+                       f"(schema {sample['schema']}, status {sample['status']})")
+        median = lambda key: sorted(s[key] for s in samples)[len(samples) // 2]
+        click.echo(f"median total {median('total_ms'):.1f} ms, create_app {median('create_app_ms'):.1f} ms")
+    finally:
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+@cli.command()
+@click.option('--scale', type=click.Choice(sorted(SCALES)), default='medium', show_default=True)
+@click.option('--repeat', type=int, default=20, show_default=True, help='Compressions timed per body and level.')
+@click.option('--output', type=click.Path(dir_okay=False), help='Also save the table as JSON.')
+def compression(scale, repeat, output):
+    """Compare compression CPU time against bytes saved for real response bodies."""
+    import time
+    workdir, _ = prepare_workdir(None, response_cache=False)
+    os.environ['COMPRESS_ENABLED'] = 'false'
+    from __init__ import create_app
+    from compression import available_encodings, compress
+    from .scenarios import Context
+    from .seed import seed
+
+    try:
+        app = create_app()
+        with app.app_context():
+            seed(SCALES[scale])
+        ctx = Context(app)
+        client = app.test_client()
+        paths = ['/api/portfolio', '/api/projects', '/api/experience', '/api/technologies',
+                 '/api/search?q=design', '/api/contacts?limit=100']
+        bodies = {path: client.get(path, headers=ctx.admin()).get_data() for path in paths}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    levels = {'gzip': (1, 4, 6, 9), 'br': (1, 4, 6, 9, 11)}
+    rows = []
+    for path, body in bodies.items():
+        for encoding in available_encodings():
+            for level in levels[encoding]:
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    encoded = compress(body, encoding, level)
+                seconds = (time.perf_counter() - start) / repeat
+                rows.append({'path': path, 'encoding': encoding, 'level': level, 'bytes': len(body),
+                             'encoded_bytes': len(encoded), 'ratio': round(len(encoded) / len(body), 4),
+                             'ms': round(seconds * 1000, 4), 'mb_per_s': round(len(body) / seconds / 1e6, 1)})
+                click.echo(f"{path:28} {len(body):9} B  {encoding:4} {level:2}  -> {len(encoded):8} B "
+                           f"({len(encoded) / len(body):6.1%})  {seconds * 1000:8.3f} ms  "
+                           f"{len(body) / seconds / 1e6:7.1f} MB/s")
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'scale': scale, 'repeat': repeat, 'results': rows}, f, indent=2, sort_keys=True)
+
+
+@cli.command('compare')
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False))
+@threshold_options
+def compare_command(baseline, current, **thresholds):
+    """Diff two result files and fail on regressions beyond the thresholds."""
+    with open(baseline) as f:
+        old = json.load(f)
+    with open(current) as f:
+        new = json.load(f)
+    if not report(old, new, thresholds):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,247 @@
+import http.client
+import json
+import platform
+import subprocess
+import threading
+import time
+from datetime import datetime
+from io import BytesIO
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from werkzeug.serving import WSGIRequestHandler, make_server
+from werkzeug.test import EnvironBuilder
+
+QUERY_HEADER = 'X-Bench-Queries'
+
+
+# --- Instrumentation ---
+def instrument(app):
+    # Counts SQL statements per request and reports them in a response header
+    from models import db
+
+    def count(conn, cursor, statement, *args):
+        # BEGIN comes from the engine profile, not from the view
+        if has_app_context() and not statement.startswith('BEGIN'):
+            g.bench_queries = g.get('bench_queries', 0) + 1
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', count)
+
+    @app.after_request
+    def report_queries(response):
+        response.headers[QUERY_HEADER] = str(g.get('bench_queries', 0))
+        return response
+
+
+def environ_builder(spec):
+    files = spec.get('files') or {}
+    data = dict(spec.get('data') or {})
+    for field, items in files.items():
+        data[field] = [(BytesIO(content), filename, mimetype) for content, filename, mimetype in items]
+    path, _, query = spec['path'].partition('?')
+    return EnvironBuilder(path=path, query_string=query, method=spec['method'], headers=spec.get('headers'),
+                          json=spec.get('json'), data=data or None)
+
+
+# --- Transports ---
+class TestClientTransport:
+    name = 'test_client'
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def send(self, spec):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.open(environ_builder(spec))
+        response.get_data()
+        return response.status_code, int(response.headers.get(QUERY_HEADER, 0))
+
+    def close(self):
+        pass
+
+
+class _KeepAliveHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class ServerTransport:
+    # The app behind werkzeug's threaded WSGI server on a loopback port, with
+    # one keep-alive connection per client thread
+    name = 'wsgi_server'
+
+    def __init__(self, app):
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=_KeepAliveHandler)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, name='bench-server', daemon=True)
+        self.thread.start()
+        self.local = threading.local()
+
+    def send(self, spec):
+        # The environ encodes form and file fields the same way the test client does
+        builder = environ_builder(spec)
+        try:
+            environ = builder.get_environ()
+            body = environ['wsgi.input'].read(int(environ.get('CONTENT_LENGTH') or 0))
+            headers = dict(builder.headers)
+            if environ.get('CONTENT_TYPE'):
+                headers['Content-Type'] = environ['CONTENT_TYPE']
+            headers['Content-Length'] = str(len(body))
+            path = builder.path + (f"?{builder.query_string}" if builder.query_string else '')
+        finally:
+            builder.close()
+        for attempt in (1, 2):
+            conn = getattr(self.local, 'conn', None)
+            if conn is None:
+                conn = self.local.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            try:
+                conn.request(spec['method'], path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                return response.status, int(response.getheader(QUERY_HEADER, 0))
+            except (http.client.HTTPException, ConnectionError):
+                # The server may close an idle keep-alive connection; retry once
+                conn.close()
+                self.local.conn = None
+                if attempt == 2:
+                    raise
+
+    def close(self):
+        self.server.shutdown()
+        self.thread.join()
+
+
+# --- Measurement ---
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def measure(transport, specs, concurrency, expect):
+    # Each worker pops the next prebuilt request; setup already happened in build()
+    latencies = []
+    queries = []
+    errors = []
+    lock = threading.Lock()
+    pending = iter(specs)
+
+    def worker():
+        while True:
+            with lock:
+                spec = next(pending, None)
+            if spec is None:
+                return
+            start = time.perf_counter()
+            try:
+                status, count = transport.send(spec)
+            except Exception as e:
+                status, count = f"{type(e).__name__}: {e}", 0
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                queries.append(count)
+                if status not in expect:
+                    errors.append(status)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    wall = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_samples': sorted({str(e) for e in errors})[:5],
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'throughput_rps': round(len(latencies) / wall, 1) if wall else None,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def with_headers(specs, headers):
+    if headers:
+        for spec in specs:
+            spec['headers'] = {**(spec.get('headers') or {}), **headers}
+    return specs
+
+
+def run(app, ctx, scenarios, transports, requests, concurrency, warmup, log=print, headers=None):
+    results = {}
+    for transport in transports:
+        for scenario in scenarios:
+            if warmup:
+                measure(transport, with_headers(scenario.build(ctx, warmup), headers), 1, scenario.expect)
+            specs = with_headers(scenario.build(ctx, requests), headers)
+            result = measure(transport, specs, min(concurrency, scenario.max_concurrency or concurrency),
+                             scenario.expect)
+            results.setdefault(scenario.name, {})[transport.name] = result
+            log(f"{transport.name:12} {scenario.name:48} p50 {result['p50_ms']:8.2f} ms  "
+                f"p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+                f"{result['throughput_rps']:8.1f} req/s  {result['queries_per_request']:5.1f} q/req"
+                + (f"  {result['errors']} errors" if result['errors'] else ''))
+    return results
+
+
+def metadata(options):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': options,
+    }
+
+
+def save(path, meta, results):
+    with open(path, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2, sort_keys=True)
+
+
+# --- Comparison ---
+def compare(baseline, current, max_latency_regression, max_throughput_drop, max_query_increase,
+            min_latency_delta_ms, metric='p95_ms'):
+    # Returns (rows, failures); rows describe every endpoint/transport pair in both runs
+    rows = []
+    failures = []
+    for name, transports in sorted(current['results'].items()):
+        for transport, new in sorted(transports.items()):
+            old = baseline['results'].get(name, {}).get(transport)
+            if old is None:
+                continue
+            problems = []
+            old_latency, new_latency = old[metric], new[metric]
+            if old_latency and new_latency - old_latency > min_latency_delta_ms \
+                    and new_latency > old_latency * (1 + max_latency_regression):
+                problems.append(f"{metric} {old_latency:.2f} -> {new_latency:.2f} ms")
+            if old['throughput_rps'] and new['throughput_rps'] < old['throughput_rps'] * (1 - max_throughput_drop):
+                problems.append(f"throughput {old['throughput_rps']:.1f} -> {new['throughput_rps']:.1f} req/s")
+            if new['queries_per_request'] > old['queries_per_request'] + max_query_increase:
+                problems.append(f"queries {old['queries_per_request']:.1f} -> {new['queries_per_request']:.1f}/req")
+            if new['errors'] > old['errors']:
+                problems.append(f"errors {old['errors']} -> {new['errors']}")
+            rows.append((name, transport, old, new, problems))
+            if problems:
+                failures.append((name, transport, problems))
+    return rows, failures
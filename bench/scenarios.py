@@ -0,0 +1,281 @@
+import itertools
+import random
+
+from .seed import ADMIN_USERNAME, ADMIN_PASSWORD, PNG_1X1
+
+# A scenario builds the requests for one route. `build(ctx, n)` returns n
+# request specs and runs any per-request setup (rows to delete, fresh tokens)
+# before timing starts. Specs are plain dicts of EnvironBuilder arguments.
+
+
+class Scenario:
+    __slots__ = ('endpoint', 'method', 'label', 'build', 'expect', 'max_concurrency')
+
+    def __init__(self, endpoint, method, label, build, expect=(200,), max_concurrency=None):
+        self.endpoint = endpoint
+        self.method = method
+        self.label = label
+        self.build = build
+        self.expect = expect
+        self.max_concurrency = max_concurrency
+
+    @property
+    def name(self):
+        return f"{self.method} {self.label}"
+
+
+class Context:
+    # Ids and tokens the scenarios draw from, loaded once after seeding
+    def __init__(self, app, seed_value=1):
+        from models import Project, Experience, Reference, Skill, Education, Certification, Contact, User
+        from routes.api import generate_token
+        self.app = app
+        self.rng = random.Random(seed_value)
+        self.counter = itertools.count()
+        with app.app_context():
+            ids = lambda model: [row[0] for row in model.query.with_entities(model.id).order_by(model.id)]
+            self.projects = ids(Project)
+            self.experience = ids(Experience)
+            self.references = ids(Reference)
+            self.skills = ids(Skill)
+            self.education = ids(Education)
+            self.certifications = ids(Certification)
+            self.contacts = ids(Contact)
+            self.token = generate_token(User.query.filter_by(username=ADMIN_USERNAME).one())
+
+    def pick(self, ids):
+        return self.rng.choice(ids)
+
+    def admin(self, token=None):
+        return {'Authorization': f"Bearer {token or self.token}"}
+
+    def fresh_tokens(self, n):
+        from models import User
+        from routes.api import generate_token
+        with self.app.app_context():
+            user = User.query.filter_by(username=ADMIN_USERNAME).one()
+            return [generate_token(user) for _ in range(n)]
+
+    def create_rows(self, make, n):
+        from models import db
+        with self.app.app_context():
+            rows = [make(self, next(self.counter)) for _ in range(n)]
+            db.session.add_all(rows)
+            db.session.commit()
+            return [row.id for row in rows]
+
+
+def get(path, admin=False):
+    return lambda ctx, n: [{'method': 'GET', 'path': path(ctx) if callable(path) else path,
+                            'headers': ctx.admin() if admin else {}} for _ in range(n)]
+
+
+def image_files():
+    return {'images': [(PNG_1X1, 'bench.png', 'image/png')]}
+
+
+def deletes(path, make):
+    def build(ctx, n):
+        return [{'method': 'DELETE', 'path': path.format(id=row_id), 'headers': ctx.admin()}
+                for row_id in ctx.create_rows(make, n)]
+    return build
+
+
+def project_row(ctx, i):
+    from models import Project
+    return Project(title=f'Doomed {i}', description='to be deleted', technologies='["Go"]')
+
+
+def skill_row(ctx, i):
+    from models import Skill
+    return Skill(name=f'Doomed {i}', proficiency=50)
+
+
+def reference_row(ctx, i):
+    from models import Reference
+    return Reference(experience_id=ctx.experience[0], name=f'Doomed {i}')
+
+
+def education_row(ctx, i):
+    from datetime import date
+    from models import Education
+    return Education(degree=f'Doomed {i}', institution='Nowhere', start_date=date(2020, 1, 1))
+
+
+def certification_row(ctx, i):
+    from models import Certification
+    return Certification(title=f'Doomed {i}', institution='Nowhere')
+
+
+def contact_row(ctx, i):
+    from models import Contact
+    return Contact(name=f'Doomed {i}', email='doomed@example.com', message='to be deleted')
+
+
+def requests_for(method, path_fn, admin=True, **body):
+    def build(ctx, n):
+        specs = []
+        for _ in range(n):
+            i = next(ctx.counter)
+            spec = {'method': method, 'path': path_fn(ctx), 'headers': ctx.admin() if admin else {}}
+            for key, value in body.items():
+                spec[key] = value(ctx, i) if callable(value) else value
+            specs.append(spec)
+        return specs
+    return build
+
+
+def reorder(ids_attr):
+    def build(ctx, n):
+        ids = getattr(ctx, ids_attr)
+        specs = []
+        for _ in range(n):
+            order = list(ids)
+            ctx.rng.shuffle(order)
+            specs.append({'method': 'POST', 'path': None, 'headers': ctx.admin(),
+                          'json': [{'op': 'order', 'id': item_id, 'order': k} for k, item_id in enumerate(order)]})
+        return specs
+    return build
+
+
+def with_path(build, path):
+    def wrapped(ctx, n):
+        specs = build(ctx, n)
+        for spec in specs:
+            spec['path'] = path
+        return specs
+    return wrapped
+
+
+def logout(ctx, n):
+    return [{'method': 'POST', 'path': '/api/admin/logout', 'headers': ctx.admin(token)}
+            for token in ctx.fresh_tokens(n)]
+
+
+def change_password(ctx, n):
+    # Each call bumps its user's token version, so every request gets its own
+    # admin user (sharing the bench password hash) and token
+    from models import db, User
+    from routes.api import generate_token
+    with ctx.app.app_context():
+        password_hash = User.query.filter_by(username=ADMIN_USERNAME).one().password_hash
+    user_ids = ctx.create_rows(lambda ctx, i: User(username=f'bench-user-{i}', password_hash=password_hash,
+                                                   is_admin=True), n)
+    with ctx.app.app_context():
+        tokens = [generate_token(db.session.get(User, user_id)) for user_id in user_ids]
+    return [{'method': 'PUT', 'path': '/api/admin/password', 'headers': ctx.admin(token),
+             'json': {'current_password': ADMIN_PASSWORD, 'new_password': ADMIN_PASSWORD}}
+            for token in tokens]
+
+
+def scenarios():
+    return [
+        # --- Public reads ---
+        Scenario('api.get_portfolio', 'GET', '/api/portfolio', get('/api/portfolio')),
+        Scenario('api.get_projects', 'GET', '/api/projects', get('/api/projects')),
+        Scenario('api.get_projects', 'GET', '/api/projects?limit=20&is_active=true',
+                 get('/api/projects?limit=20&is_active=true')),
+        Scenario('api.get_projects', 'GET', '/api/projects?tech=python,flask', get('/api/projects?tech=python,flask')),
+        Scenario('api.get_project', 'GET', '/api/projects/<id>',
+                 get(lambda ctx: f"/api/projects/{ctx.pick(ctx.projects)}")),
+        Scenario('api.get_technologies', 'GET', '/api/technologies', get('/api/technologies')),
+        Scenario('api.search_all', 'GET', '/api/search?q=design', get('/api/search?q=design')),
+        Scenario('api.uploaded_file', 'GET', '/api/uploads/<file>', get('/api/uploads/bench/pixel.png')),
+        Scenario('api.profile', 'GET', '/api/profile', get('/api/profile')),
+        Scenario('api.certifications', 'GET', '/api/certifications', get('/api/certifications')),
+        Scenario('api.get_stats', 'GET', '/api/stats', get('/api/stats')),
+        Scenario('api.get_skills', 'GET', '/api/skills', get('/api/skills')),
+        Scenario('api.get_experience', 'GET', '/api/experience', get('/api/experience')),
+        Scenario('api.get_references', 'GET', '/api/experience/<id>/references',
+                 get(lambda ctx: f"/api/experience/{ctx.pick(ctx.experience)}/references")),
+        Scenario('api.get_education', 'GET', '/api/education', get('/api/education')),
+        Scenario('api.get_contacts', 'GET', '/api/contacts?limit=20', get('/api/contacts?limit=20')),
+        # --- Admin reads ---
+        Scenario('api.search_all', 'GET', '/api/search?q=budget&types=contact',
+                 get('/api/search?q=budget&types=contact', admin=True)),
+        Scenario('api.contact_queue_metrics', 'GET', '/api/contacts/queue', get('/api/contacts/queue', admin=True)),
+        Scenario('api.get_metrics', 'GET', '/api/metrics', get('/api/metrics', admin=True)),
+        # --- Auth ---
+        # Password hashing runs while the request holds the writer connection,
+        # so concurrent calls only measure queueing for it; run them one at a time
+        Scenario('api.admin_login', 'POST', '/api/admin/login', requests_for(
+            'POST', lambda ctx: '/api/admin/login', admin=False,
+            json={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD}), max_concurrency=1),
+        Scenario('api.admin_logout', 'POST', '/api/admin/logout', logout),
+        Scenario('api.change_password', 'PUT', '/api/admin/password', change_password, max_concurrency=1),
+        Scenario('api.create_admin', 'POST', '/api/admin/create', requests_for(
+            'POST', lambda ctx: '/api/admin/create', admin=False,
+            json={'username': 'x', 'password': 'y'}), expect=(400,)),
+        # --- Writes ---
+        Scenario('api.create_project', 'POST', '/api/projects', requests_for(
+            'POST', lambda ctx: '/api/projects',
+            data=lambda ctx, i: {'title': f'New {i}', 'description': 'bench', 'technologies': '["Python"]'},
+            files=lambda ctx, i: image_files()), expect=(201,)),
+        Scenario('api.update_project', 'PUT', '/api/projects/<id>', requests_for(
+            'PUT', lambda ctx: f"/api/projects/{ctx.pick(ctx.projects)}",
+            data=lambda ctx, i: {'title': f'Renamed {i}'})),
+        Scenario('api.delete_project', 'DELETE', '/api/projects/<id>', deletes('/api/projects/{id}', project_row)),
+        Scenario('api.profile', 'PUT', '/api/profile', requests_for(
+            'PUT', lambda ctx: '/api/profile', data=lambda ctx, i: {'title': f'Engineer {i}'})),
+        Scenario('api.certifications', 'POST', '/api/certifications', requests_for(
+            'POST', lambda ctx: '/api/certifications', admin=False,
+            data=lambda ctx, i: {'title': f'Cert {i}', 'institution': 'Bench'}), expect=(201,)),
+        Scenario('api.update_certification', 'PUT', '/api/certifications/<id>', requests_for(
+            'PUT', lambda ctx: f"/api/certifications/{ctx.pick(ctx.certifications)}",
+            data=lambda ctx, i: {'description': f'Updated {i}'})),
+        Scenario('api.delete_certification', 'DELETE', '/api/certifications/<id>',
+                 deletes('/api/certifications/{id}', certification_row)),
+        Scenario('api.create_skill', 'POST', '/api/skills', requests_for(
+            'POST', lambda ctx: '/api/skills', json=lambda ctx, i: {'name': f'Skill {i}', 'proficiency': 70}),
+            expect=(201,)),
+        Scenario('api.update_skill', 'PUT', '/api/skills/<id>', requests_for(
+            'PUT', lambda ctx: f"/api/skills/{ctx.pick(ctx.skills)}", json=lambda ctx, i: {'proficiency': i % 100})),
+        Scenario('api.delete_skill', 'DELETE', '/api/skills/<id>', deletes('/api/skills/{id}', skill_row)),
+        Scenario('api.create_experience', 'POST', '/api/experience', requests_for(
+            'POST', lambda ctx: '/api/experience',
+            json=lambda ctx, i: {'title': f'Role {i}', 'company': 'Bench', 'description': 'bench',
+                                 'start_date': '2020-01-01'}), expect=(201,)),
+        Scenario('api.create_reference', 'POST', '/api/experience/<id>/references', requests_for(
+            'POST', lambda ctx: f"/api/experience/{ctx.pick(ctx.experience)}/references",
+            json=lambda ctx, i: {'name': f'Referee {i}'}), expect=(201,)),
+        Scenario('api.update_reference', 'PUT', '/api/references/<id>', requests_for(
+            'PUT', lambda ctx: f"/api/references/{ctx.pick(ctx.references)}", json=lambda ctx, i: {'note': f'{i}'})),
+        Scenario('api.delete_reference', 'DELETE', '/api/references/<id>',
+                 deletes('/api/references/{id}', reference_row)),
+        Scenario('api.create_education', 'POST', '/api/education', requests_for(
+            'POST', lambda ctx: '/api/education',
+            json=lambda ctx, i: {'degree': f'Degree {i}', 'institution': 'Bench', 'start_date': '2020-01-01'}),
+            expect=(201,)),
+        Scenario('api.update_education', 'PUT', '/api/education/<id>', requests_for(
+            'PUT', lambda ctx: f"/api/education/{ctx.pick(ctx.education)}", json=lambda ctx, i: {'gpa': 3.5})),
+        Scenario('api.delete_education', 'DELETE', '/api/education/<id>',
+                 deletes('/api/education/{id}', education_row)),
+        Scenario('api.create_contact', 'POST', '/api/contacts', requests_for(
+            'POST', lambda ctx: '/api/contacts', admin=False,
+            json=lambda ctx, i: {'name': f'Sender {i}', 'email': 's@example.com', 'message': 'Hello from bench'}),
+            expect=(201, 202)),
+        Scenario('api.mark_contact_read', 'PUT', '/api/contacts/<id>', requests_for(
+            'PUT', lambda ctx: f"/api/contacts/{ctx.pick(ctx.contacts)}")),
+        Scenario('api.delete_contact', 'DELETE', '/api/contacts/<id>', deletes('/api/contacts/{id}', contact_row)),
+        # --- Batches ---
+        Scenario('api.batch_skills', 'POST', '/api/skills/batch', with_path(reorder('skills'), '/api/skills/batch')),
+        Scenario('api.batch_projects', 'POST', '/api/projects/batch',
+                 with_path(reorder('projects'), '/api/projects/batch')),
+        Scenario('api.batch_experience', 'POST', '/api/experience/batch',
+                 with_path(reorder('experience'), '/api/experience/batch')),
+        Scenario('api.batch_education', 'POST', '/api/education/batch',
+                 with_path(reorder('education'), '/api/education/batch')),
+    ]
+
+
+def uncovered(app, selected):
+    # (endpoint, method) pairs on api_bp that no scenario exercises
+    covered = {(s.endpoint, s.method) for s in selected}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if not rule.endpoint.startswith('api.'):
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if (rule.endpoint, method) not in covered:
+                missing.append(f"{method} {rule.rule}")
+    return missing
@@ -0,0 +1,131 @@
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+# Smallest valid PNG (1x1), used for seeded images and upload scenarios
+PNG_1X1 = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082'
+)
+ADMIN_USERNAME = 'bench-admin'
+ADMIN_PASSWORD = 'bench-password'
+TECHNOLOGIES = ['Python', 'Flask', 'React', 'Vite', 'PostgreSQL', 'SQLite', 'Docker', 'Redis',
+                'TypeScript', 'Node.js', 'Go', 'Rust', 'Kubernetes', 'GraphQL', 'Tailwind']
+WORDS = ('project build design data api service mobile web platform cloud deploy scale test '
+         'client freelance budget timeline hiring meeting quote startup consulting').split()
+
+SCALES = {
+    'small': dict(projects=20, images=3, experience=10, references=2, skills=20,
+                  education=3, certifications=5, contacts=2000),
+    'medium': dict(projects=100, images=4, experience=30, references=3, skills=60,
+                   education=6, certifications=20, contacts=50000),
+    'large': dict(projects=500, images=6, experience=100, references=5, skills=150,
+                  education=10, certifications=60, contacts=300000),
+}
+
+# Directory holding the app package, put on sys.path by prepare_workdir()
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def prepare_workdir(workdir, response_cache=True):
+    # Points the app at a fresh database and upload folder; returns the
+    # directory and whether it belongs to the caller (and must be kept)
+    keep = workdir is not None
+    workdir = workdir or tempfile.mkdtemp(prefix='portfolio-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    database = os.path.join(workdir, 'bench.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(database + suffix):
+            os.remove(database + suffix)
+    # Config is read from the environment when the app package is imported
+    os.environ.update({
+        'DATABASE_URI': f"sqlite:///{database}",
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+        'IMAGE_VARIANTS_ENABLED': 'false',
+        'UPLOAD_GC_INTERVAL': '0',
+        'RESPONSE_CACHE_ENABLED': 'true' if response_cache else 'false',
+    })
+    sys.path.insert(0, APP_DIR)
+    return workdir, keep
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def chunks(rows, size=5000):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def seed(scale, seed_value=1):
+    # Fills an empty database inside the current app context. Rows go in with
+    # executemany INSERTs, so the derived data (counters, tags, search) is
+    # rebuilt at the end the same way an upgrade would build it.
+    from flask import current_app
+    from models import (db, User, Profile, Project, ProjectImage, Skill, Experience, Reference,
+                        Education, Certification, Contact)
+    import search
+    import stats
+    import tags
+    from storage import relpath_to_url
+
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+
+    # One real image that every seeded image row points at
+    relpath = 'bench/pixel.png'
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(PNG_1X1)
+    image_url = relpath_to_url(relpath)
+
+    db.session.add(User(username=ADMIN_USERNAME, password_hash=generate_password_hash(ADMIN_PASSWORD),
+                        is_admin=True))
+    db.session.add(Profile(name='Bench User', title='Engineer', bio=sentence(rng, 40),
+                           email='bench@example.com', avatar=image_url))
+
+    def many(model, rows):
+        for chunk in chunks(rows):
+            db.session.execute(insert(model), chunk)
+
+    many(Project, [dict(
+        id=i + 1, title=f'Project {i}', description=sentence(rng, 60),
+        technologies=json.dumps(rng.sample(TECHNOLOGIES, rng.randint(2, 6))),
+        github_url=f'https://github.com/example/project-{i}', featured=rng.random() < 0.2,
+        order=i, is_active=rng.random() < 0.9, created_at=now - timedelta(days=rng.randint(0, 720)),
+    ) for i in range(scale['projects'])])
+    many(ProjectImage, [dict(project_id=p + 1, url=image_url, order=n)
+                        for p in range(scale['projects']) for n in range(scale['images'])])
+    many(Skill, [dict(name=f'Skill {i}', proficiency=rng.randint(30, 100), category=rng.choice(['technical', 'soft']),
+                      order=i, is_active=True, created_at=now - timedelta(days=rng.randint(0, 720)))
+                 for i in range(scale['skills'])])
+    many(Experience, [dict(
+        id=i + 1, title=f'Role {i}', company=f'Company {i}', description=sentence(rng, 50),
+        start_date=date(2015, 1, 1) + timedelta(days=90 * i), current=i == 0, location='Remote', order=i,
+    ) for i in range(scale['experience'])])
+    many(Reference, [dict(experience_id=e + 1, name=f'Referee {e}-{n}', email=f'ref{e}{n}@example.com',
+                          note=sentence(rng, 12))
+                     for e in range(scale['experience']) for n in range(scale['references'])])
+    many(Education, [dict(degree=f'Degree {i}', institution=f'University {i}', description=sentence(rng, 20),
+                          start_date=date(2010 + i, 9, 1), order=i) for i in range(scale['education'])])
+    many(Certification, [dict(title=f'Certificate {i}', institution=f'Institute {i}', description=sentence(rng, 15),
+                              date_awarded=date(2020, 1, 1) + timedelta(days=30 * i), order=i,
+                              certificate_url=image_url) for i in range(scale['certifications'])])
+    many(Contact, [dict(name=f'Sender {i}', email=f'sender{i}@example.com', message=sentence(rng, 30),
+                        created_at=now - timedelta(minutes=scale['contacts'] - i), read=rng.random() < 0.5)
+                   for i in range(scale['contacts'])])
+    db.session.commit()
+
+    stats.rebuild()
+    tags.rebuild()
+    search.ensure_search_index()
+    search.rebuild()
+    return relpath
@@ -0,0 +1,244 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from compression import compress, compressor
+
+
+class _Entry:
+    __slots__ = ('body', 'status', 'mimetype', 'etag', 'tags', 'versions', 'encoded', 'size', 'live')
+
+    def __init__(self, body, status, mimetype, etag, tags, versions):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.etag = etag
+        self.tags = tags
+        self.versions = versions
+        # Compressed bodies by content coding, added on first request for each
+        self.encoded = {}
+        self.size = len(body)
+        self.live = False
+
+
+# LRU cache for public GET responses. Entries are tagged with the tables they
+# were built from and dropped as soon as a commit touches one of them.
+# Invalidations are also published as per-table stamp files in
+# RESPONSE_CACHE_STAMP_DIR (instance/cache-stamps by default), so a write in
+# one worker process drops the entries every other worker built from it.
+class ResponseCache:
+
+    def __init__(self, app=None):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._size = 0
+        self.max_entries = 256
+        self.max_bytes = 8 * 1024 * 1024
+        self.enabled = True
+        self.stamp_dir = None
+        self.hits = 0
+        self.misses = 0
+        # Called with the set of tables after each invalidation
+        self.listeners = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', self.max_entries)
+        self.max_bytes = app.config.get('RESPONSE_CACHE_MAX_BYTES', self.max_bytes)
+        self.stamp_dir = (app.config.get('RESPONSE_CACHE_STAMP_DIR')
+                          or os.path.join(app.instance_path, 'cache-stamps'))
+        os.makedirs(self.stamp_dir, exist_ok=True)
+        # Without writable stamps other workers would serve stale responses forever
+        if not os.access(self.stamp_dir, os.W_OK | os.X_OK):
+            raise RuntimeError(f"RESPONSE_CACHE_STAMP_DIR {self.stamp_dir!r} is not writable")
+        app.extensions['response_cache'] = self
+
+    # --- Versioning ---
+    def _stamp(self, tag):
+        if not self.stamp_dir:
+            return 0
+        try:
+            return os.stat(os.path.join(self.stamp_dir, tag)).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def versions(self, tags):
+        return tuple((self._versions.get(t, 0), self._stamp(t)) for t in tags)
+
+    def invalidate(self, tags):
+        tags = set(tags)
+        if not tags:
+            return
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+            for key in [k for k, e in self._entries.items() if tags & e.tags]:
+                self._remove(key)
+        if self.stamp_dir:
+            for tag in tags:
+                path = os.path.join(self.stamp_dir, tag)
+                with open(path, 'a'):
+                    os.utime(path)
+        for listener in self.listeners:
+            listener(tags)
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries.values():
+                entry.live = False
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- Storage ---
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.versions != self.versions(entry.tags):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def set(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            entry.live = True
+            self._size += entry.size
+            self._trim()
+
+    def encoded_body(self, entry, encoding):
+        # Compressed once per entry and coding; later hits reuse the bytes
+        data = entry.encoded.get(encoding)
+        if data is not None:
+            return data
+        data = compress(entry.body, encoding, compressor.cached_levels[encoding])
+        with self._lock:
+            if encoding not in entry.encoded:
+                entry.encoded[encoding] = data
+                entry.size += len(data)
+                if entry.live:
+                    self._size += len(data)
+                    self._trim()
+        return data
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        entry.live = False
+        self._size -= entry.size
+
+    def _trim(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+
+    # --- View decorator ---
+    @staticmethod
+    def make_key():
+        args = sorted(request.args.items(multi=True))
+        view_args = sorted((request.view_args or {}).items())
+        return (request.endpoint, tuple(view_args), tuple(args))
+
+    def cached(self, *models):
+        tags = frozenset(m.__tablename__ for m in models)
+
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                if request.method != 'GET' or not self.enabled:
+                    return f(*args, **kwargs)
+                key = self.make_key()
+                entry = self.get(key)
+                if entry is None:
+                    versions = self.versions(tags)
+                    response = current_app.make_response(f(*args, **kwargs))
+                    if response.status_code != 200 or response.direct_passthrough:
+                        return response
+                    body = response.get_data()
+                    entry = _Entry(body, response.status_code, response.mimetype,
+                                   hashlib.sha1(body).hexdigest(), tags, versions)
+                    self.set(key, entry)
+                return self.build_response(entry)
+            # Tables the view reads, for other consumers of the same dependencies
+            decorated.cache_tags = tags
+            return decorated
+        return decorator
+
+    def build_response(self, entry):
+        body, etag, encoding = entry.body, entry.etag, None
+        compressible = compressor.applies(entry.mimetype, len(entry.body))
+        if compressible:
+            encoding = compressor.negotiate()
+            if encoding is not None:
+                # Each coding gets its own validator, as the bytes differ
+                body, etag = self.encoded_body(entry, encoding), f"{entry.etag}-{encoding}"
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(body, status=entry.status, mimetype=entry.mimetype)
+            if encoding is not None:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        if compressible:
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+response_cache = ResponseCache()
+
+
+# --- Write tracking ---
+def _touched(session):
+    return session.info.setdefault('touched_tables', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    touched = _touched(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table:
+            touched.add(table)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        touched = _touched(orm_execute_state.session)
+        for mapper in orm_execute_state.all_mappers:
+            touched.add(mapper.local_table.name)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    touched = session.info.pop('touched_tables', None)
+    if touched:
+        response_cache.invalidate(touched)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('touched_tables', None)
@@ -0,0 +1,155 @@
+import logging
+from collections import defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from models import (db, Change, Profile, Project, ProjectImage, ProjectImageVariant, Skill, Experience, Reference,
+                    Education, Certification, Contact)
+from serializers import PROJECT, PROFILE, SKILL, EXPERIENCE, EDUCATION, CERTIFICATION, CONTACT
+
+logger = logging.getLogger(__name__)
+
+# Resources in the change feed. name: (model, serializer, loader options, admin_only)
+RESOURCES = {
+    'profile': (Profile, PROFILE, (), False),
+    'project': (Project, PROJECT, (selectinload(Project.images).selectinload(ProjectImage.variants),), False),
+    'skill': (Skill, SKILL, (), False),
+    'experience': (Experience, EXPERIENCE, (selectinload(Experience.references),), False),
+    'education': (Education, EDUCATION, (), False),
+    'certification': (Certification, CERTIFICATION, (), False),
+    'contact': (Contact, CONTACT, (), True),
+}
+PUBLIC_RESOURCES = tuple(name for name, (_, _, _, admin_only) in RESOURCES.items() if not admin_only)
+# Tables serialized inside a parent resource; a write to one is a change to
+# the parent. table: (resource, SQL selecting the parent's id as row_id, with
+# {row} standing for new/old). The parent must still exist, so rows removed
+# along with their parent do not turn its tombstone back into an upsert.
+CHILDREN = {
+    ProjectImage.__tablename__: (
+        'project', f"SELECT id AS row_id FROM {Project.__tablename__} WHERE id = {{row}}.project_id"),
+    ProjectImageVariant.__tablename__: (
+        'project', f"SELECT p.id AS row_id FROM {Project.__tablename__} p JOIN {ProjectImage.__tablename__} i "
+                   f"ON i.project_id = p.id WHERE i.id = {{row}}.image_id"),
+    Reference.__tablename__: (
+        'experience', f"SELECT id AS row_id FROM {Experience.__tablename__} WHERE id = {{row}}.experience_id"),
+}
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+_available = None
+
+
+def is_available():
+    return bool(_available)
+
+
+# --- Schema ---
+# Triggers rather than session events, so executemany UPDATEs, bulk deletes
+# and raw SQL are recorded too, in the writing transaction. REPLACE drops the
+# row's previous entry, and AUTOINCREMENT never reuses a seq, so the log keeps
+# one entry per row and seq only grows.
+def record(resource, select_ids, deleted):
+    return (f"REPLACE INTO {Change.__tablename__} (resource, row_id, deleted, changed_at) "
+            f"SELECT '{resource}', row_id, {int(deleted)}, CURRENT_TIMESTAMP FROM ({select_ids});")
+
+
+def trigger_ddl():
+    # {trigger name: CREATE statement}
+    ddl = {}
+
+    def trigger(table, event, statements):
+        name = f"{table}_changes_{event[0].lower()}"
+        ddl[name] = f"CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN {' '.join(statements)} END"
+
+    for resource, (model, _, _, _) in RESOURCES.items():
+        table = model.__tablename__
+        trigger(table, 'INSERT', [record(resource, 'SELECT new.id AS row_id', False)])
+        trigger(table, 'UPDATE', [record(resource, 'SELECT new.id AS row_id', False)])
+        trigger(table, 'DELETE', [record(resource, 'SELECT old.id AS row_id', True)])
+    for table, (resource, parent) in CHILDREN.items():
+        trigger(table, 'INSERT', [record(resource, parent.format(row='new'), False)])
+        # A row moved to another parent changes both
+        trigger(table, 'UPDATE', [record(resource, parent.format(row='old'), False),
+                                  record(resource, parent.format(row='new'), False)])
+        trigger(table, 'DELETE', [record(resource, parent.format(row='old'), False)])
+    return ddl
+
+
+def ensure_change_log():
+    # Creates missing triggers (recreating any whose definition changed) and
+    # records every existing row once, so a client starting from since=0 gets
+    # the full dataset
+    global _available
+    if db.engine.dialect.name != 'sqlite':
+        logger.warning('The change feed needs SQLite triggers; /api/changes is disabled')
+        _available = False
+        return []
+    # Runs on the session's connection: the writer pool holds a single connection
+    conn = db.session.connection()
+    existing = dict(conn.exec_driver_sql("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall())
+    created = []
+    for name, ddl in trigger_ddl().items():
+        if existing.get(name) == ddl:
+            continue
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        conn.exec_driver_sql(ddl)
+        created.append(name)
+    if created:
+        for resource, (model, _, _, _) in RESOURCES.items():
+            conn.exec_driver_sql(
+                f"INSERT OR IGNORE INTO {Change.__tablename__} (resource, row_id, deleted, changed_at) "
+                f"SELECT '{resource}', id, 0, CURRENT_TIMESTAMP FROM {model.__tablename__}")
+    db.session.commit()
+    _available = True
+    return created
+
+
+def detect_change_log():
+    # For workers that skip ensure_change_log()
+    global _available
+    if db.engine.dialect.name != 'sqlite':
+        _available = False
+        return False
+    conn = db.session.connection()
+    triggers = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    db.session.commit()
+    _available = set(trigger_ddl()) <= triggers
+    return _available
+
+
+# --- Queries ---
+def latest_seq():
+    return db.session.execute(select(db.func.max(Change.seq))).scalar() or 0
+
+
+def feed(since, limit, resources):
+    # Entries after `since` in seq order, with the current row for upserts.
+    # A row that is gone by the time it is read is reported as deleted.
+    entries = db.session.execute(
+        select(Change).where(Change.seq > since, Change.resource.in_(resources))
+        .order_by(Change.seq).limit(limit + 1)
+    ).scalars().all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    wanted = defaultdict(set)
+    for entry in entries:
+        if not entry.deleted:
+            wanted[entry.resource].add(entry.row_id)
+    rows = {}
+    for resource, ids in wanted.items():
+        model, serializer, options, _ = RESOURCES[resource]
+        for obj in model.query.options(*options).filter(model.id.in_(ids)):
+            rows[(resource, obj.id)] = serializer.one(obj)
+    changes = []
+    for entry in entries:
+        data = rows.get((entry.resource, entry.row_id))
+        changes.append({
+            'seq': entry.seq,
+            'type': entry.resource,
+            'id': entry.row_id,
+            'op': 'upsert' if data is not None else 'delete',
+            'changed_at': entry.changed_at.isoformat() if entry.changed_at else None,
+            'data': data,
+        })
+    return changes, has_more
@@ -0,0 +1,251 @@
+import os
+
+import click
+
+
+def register_commands(app):
+    @app.cli.command('upgrade-db')
+    def upgrade_db():
+        """Create missing tables, columns and indexes without dropping data."""
+        from schema import run_upgrades, schema_fingerprint, startup_lock, write_marker
+        with startup_lock():
+            columns, indexes = run_upgrades()
+            write_marker(schema_fingerprint())
+        if columns:
+            click.echo(f"Added columns: {', '.join(columns)}")
+        if indexes:
+            click.echo(f"Created indexes: {', '.join(indexes)}")
+        if not columns and not indexes:
+            click.echo('Schema is up to date')
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """EXPLAIN the hot queries and fail on full scans or temp sorts."""
+        from schema import check_query_plans
+        failed = False
+        for name, plan, problems in check_query_plans():
+            status = 'FAIL' if problems else 'ok'
+            click.echo(f"[{status}] {name}: {' | '.join(plan)}")
+            for problem in problems:
+                click.echo(f"       {problem}")
+            failed = failed or bool(problems)
+        if failed:
+            raise SystemExit(1)
+
+    @app.cli.command('generate-image-variants')
+    @click.option('--missing-only/--all', default=True, help='Skip images that already have variants.')
+    def generate_image_variants(missing_only):
+        """Backfill responsive variants for existing project images."""
+        from models import ProjectImage
+        from images import process_images_now, shutdown_pool
+        query = ProjectImage.query
+        if missing_only:
+            query = query.filter(~ProjectImage.variants.any())
+        images = query.all()
+        try:
+            processed = process_images_now(images)
+        finally:
+            shutdown_pool()
+        click.echo(f"Generated variants for {processed} of {len(images)} images")
+
+    @app.cli.command('uploads-gc')
+    @click.option('--dry-run', is_flag=True, help='Report without deleting anything.')
+    @click.option('--grace', type=int, default=None, help='Keep orphans younger than this many seconds.')
+    def uploads_gc(dry_run, grace):
+        """Delete uploaded files that no row references and report disk usage."""
+        from storage import collect_garbage
+        if grace is None:
+            grace = app.config['UPLOAD_GC_GRACE']
+        report = collect_garbage(grace, dry_run=dry_run)
+        click.echo(f"Live:    {report['live_files']} files, {report['live_bytes']} bytes")
+        click.echo(f"Orphans: {report['orphan_files']} files, {report['orphan_bytes']} bytes")
+        click.echo(f"Deleted: {report['deleted_files']} files, {report['deleted_bytes']} bytes")
+        for relpath in report['missing']:
+            click.echo(f"Missing: {relpath}")
+
+    @app.cli.command('uploads-migrate')
+    def uploads_migrate():
+        """Move flat legacy uploads into the content-addressed layout."""
+        from storage import migrate_legacy_uploads
+        rows, blobs = migrate_legacy_uploads()
+        click.echo(f"Rewrote {rows} references to {blobs} files")
+
+    @app.cli.command('uploads-precompress')
+    def uploads_precompress():
+        """Write .gz/.br sidecars for stored compressible uploads."""
+        from storage import iter_stored_files, precompress, sidecar_base, COMPRESSIBLE_EXTENSIONS
+        count = 0
+        for relpath, path in iter_stored_files():
+            if sidecar_base(relpath) is None and os.path.splitext(path)[1] in COMPRESSIBLE_EXTENSIONS:
+                count += len(precompress(path))
+        click.echo(f"Wrote {count} sidecar files")
+
+    @app.cli.command('jobs-work')
+    @click.option('--workers', type=int, default=None, help='Worker threads (default: JOB_WORKERS, at least 1).')
+    @click.option('--burst', is_flag=True, help='Run the jobs that are due, then exit.')
+    def jobs_work(workers, burst):
+        """Run background jobs in this process."""
+        import socket
+        from jobs import job_runner
+        from images import shutdown_pool
+        worker = f"{socket.gethostname()}:{os.getpid()}:cli"
+        if burst:
+            count = 0
+            try:
+                while job_runner.run_once(worker):
+                    count += 1
+            finally:
+                shutdown_pool()
+            click.echo(f"Ran {count} jobs")
+            return
+        threads = job_runner.start(max(1, workers or app.config['JOB_WORKERS']))
+        click.echo(f"Running jobs on {len(threads)} threads")
+        for thread in threads:
+            thread.join()
+
+    @app.cli.command('stats-rebuild')
+    def stats_rebuild():
+        """Recompute the /api/stats counters from the tables."""
+        import stats
+        deltas = stats.rebuild()
+        for (metric, bucket), count in sorted(deltas.items()):
+            click.echo(f"{metric:15} {bucket:8} {count}")
+
+    @app.cli.command('bench-serializers')
+    @click.option('--rows', type=int, default=10000, help='Number of synthetic rows to serialize.')
+    @click.option('--repeat', type=int, default=5, help='Best of this many runs.')
+    def bench_serializers(rows, repeat):
+        """Measure row-to-dict and JSON encoding throughput on synthetic rows."""
+        import time
+        from datetime import datetime
+        from models import Project, ProjectImage, Contact
+        import serializers
+
+        now = datetime.utcnow()
+        projects = [
+            Project(id=i, title=f'Project {i}', description='x' * 200, technologies='["python", "flask"]',
+                    github_url='https://example.com', order=i, featured=False, is_active=True, created_at=now,
+                    images=[ProjectImage(url=f'/uploads/{i}.jpg', order=0)])
+            for i in range(rows)
+        ]
+        contacts = [Contact(id=i, name='Name', email='a@example.com', message='m' * 100,
+                            created_at=now, read=False) for i in range(rows)]
+
+        def best(fn):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        def report(label, seconds):
+            click.echo(f"{label:40} {seconds * 1000:8.1f} ms  {rows / seconds:12,.0f} rows/s")
+
+        report('project (all fields)', best(lambda: serializers.PROJECT.many(projects)))
+        report('project (fields=id,title)', best(lambda: serializers.PROJECT.many(projects, ['id', 'title'])))
+        report('contact (all fields)', best(lambda: serializers.CONTACT.many(contacts)))
+        payload = serializers.PROJECT.many(projects)
+        for name, provider in serializers.JSON_PROVIDERS.items():
+            if name == 'orjson' and serializers.orjson is None:
+                click.echo(f"{'encode projects (' + name + ')':40} skipped, orjson not installed")
+                continue
+            encoder = provider(app)
+            report(f'encode projects ({name})', best(lambda: encoder.dumps(payload)))
+
+    @app.cli.command('sqlite-stress')
+    @click.option('--readers', type=int, default=16, help='Concurrent reader threads.')
+    @click.option('--seconds', type=float, default=5.0, help='How long to run.')
+    def sqlite_stress(readers, seconds):
+        """Run GET readers against one writer and fail on any lock error.
+
+        The writer posts contact messages, which are deleted again at the end.
+        """
+        import threading
+        import time
+        from cache import response_cache
+        from models import db, Contact
+
+        paths = ['/api/projects', '/api/skills', '/api/experience', '/api/portfolio', '/api/stats']
+        marker = '__sqlite_stress__'
+        stop = threading.Event()
+        counts = {'reads': 0, 'writes': 0}
+        errors = []
+        lock = threading.Lock()
+
+        def record(kind, response):
+            with lock:
+                if response.status_code >= 400:
+                    errors.append(f"{kind} {response.status_code}: {response.get_data(as_text=True)[:200]}")
+                else:
+                    counts[kind] += 1
+
+        def reader(offset):
+            client = app.test_client()
+            i = offset
+            while not stop.is_set():
+                record('reads', client.get(paths[i % len(paths)]))
+                i += 1
+
+        def writer():
+            client = app.test_client()
+            while not stop.is_set():
+                record('writes', client.post('/api/contacts', json={
+                    'name': marker, 'email': 'stress@example.com', 'message': 'load test'}))
+
+        # Every read must reach the database
+        cache_enabled, response_cache.enabled = response_cache.enabled, False
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads.append(threading.Thread(target=writer))
+        try:
+            for thread in threads:
+                thread.start()
+            time.sleep(seconds)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            response_cache.enabled = cache_enabled
+            with app.app_context():
+                for contact in Contact.query.filter_by(name=marker):
+                    db.session.delete(contact)
+                db.session.commit()
+        click.echo(f"{counts['reads']} reads ({counts['reads'] / seconds:.0f}/s), "
+                   f"{counts['writes']} writes ({counts['writes'] / seconds:.0f}/s), {len(errors)} errors")
+        for error in errors[:10]:
+            click.echo(f"  {error}")
+        if errors:
+            raise SystemExit(1)
+
+    @app.cli.command('search-rebuild')
+    @click.option('--optimize/--no-optimize', default=True, help='Merge index segments after rebuilding.')
+    def search_rebuild(optimize):
+        """Rebuild the full-text search indexes from the source tables."""
+        import search
+        created = search.ensure_search_index()
+        if not search.is_available():
+            click.echo('Full-text search is not available on this database')
+            raise SystemExit(1)
+        search.rebuild(optimize=optimize)
+        click.echo(f"Rebuilt {', '.join(search.INDEXES)}" + (f" (created {', '.join(created)})" if created else ''))
+
+    @app.cli.command('tags-rebuild')
+    def tags_rebuild():
+        """Re-derive project technology tags from the technologies strings."""
+        import tags
+        count = tags.rebuild()
+        click.echo(f"Retagged {count} projects")
+
+    @app.cli.command('snapshot-export')
+    @click.option('--dir', 'out_dir', type=click.Path(file_okay=False), default=None,
+                  help='Output directory (default: SNAPSHOT_DIR).')
+    def snapshot_export(out_dir):
+        """Render the public GET routes to static JSON and link their uploads."""
+        import snapshot
+        out_dir = out_dir or app.config.get('SNAPSHOT_DIR')
+        if not out_dir:
+            click.echo('Pass --dir or set SNAPSHOT_DIR')
+            raise SystemExit(1)
+        report = snapshot.export(os.path.abspath(out_dir))
+        click.echo(f"Rendered {report['rendered']} routes: {report['written']} written, {report['removed']} removed; "
+                   f"uploads {report['uploads_linked']} linked, {report['uploads_removed']} removed")
@@ -0,0 +1,79 @@
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Uploads are served by send_file (streamed, direct passthrough) and carry
+# their own precompressed sidecars, so only generated bodies are considered
+COMPRESSIBLE_MIMETYPES = frozenset({'application/json', 'text/plain', 'text/html', 'text/csv',
+                                    'text/event-stream', 'application/javascript', 'image/svg+xml'})
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+# Compresses JSON and text responses for clients that accept gzip or, when
+# the brotli package is installed, br. Responses from the response cache
+# arrive already encoded (their compressed bodies are cached with them), so
+# only uncached bodies pay compression CPU per request.
+class ResponseCompressor:
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.min_size = 500
+        # Per-request levels favour CPU; cached bodies are compressed once, harder
+        self.levels = {'gzip': 6, 'br': 4}
+        self.cached_levels = {'gzip': 9, 'br': 9}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('COMPRESS_ENABLED', True)
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.levels = {'gzip': app.config.get('COMPRESS_GZIP_LEVEL', self.levels['gzip']),
+                       'br': app.config.get('COMPRESS_BROTLI_QUALITY', self.levels['br'])}
+        self.cached_levels = {'gzip': app.config.get('COMPRESS_CACHED_GZIP_LEVEL', self.cached_levels['gzip']),
+                              'br': app.config.get('COMPRESS_CACHED_BROTLI_QUALITY', self.cached_levels['br'])}
+        app.extensions['compressor'] = self
+        if self.enabled:
+            app.after_request(self.compress_response)
+
+    def applies(self, mimetype, size):
+        return self.enabled and mimetype in COMPRESSIBLE_MIMETYPES and size >= self.min_size
+
+    @staticmethod
+    def negotiate():
+        # Best accepted encoding by q-value; br wins ties. None means identity.
+        return request.accept_encodings.best_match(available_encodings())
+
+    def compress_response(self, response):
+        if (response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers
+                or response.status_code < 200 or response.status_code in (204, 206, 304)):
+            return response
+        body = response.get_data()
+        if not self.applies(response.mimetype, len(body)):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate()
+        if encoding is None:
+            return response
+        response.set_data(compress(body, encoding, self.levels[encoding]))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
+
+
+compressor = ResponseCompressor()
@@ -4,4 +4,131 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-this')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URI', 'sqlite:///portfolio.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False 
-    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(os.path.dirname(__file__), 'uploads')) 
\ No newline at end of file
+
+    # Startup schema check: 'auto' upgrades only when the schema marker stored
+    # in the database differs from the models, 'always' upgrades on every boot,
+    # 'skip' trusts that `flask upgrade-db` ran as a release step
+    SCHEMA_CHECK = os.environ.get('SCHEMA_CHECK', 'auto')
+
+    # SQLite engine profile (file databases only): WAL, pragmas applied to every
+    # connection, one serialized writer connection, and a read-only pool of
+    # SQLITE_READ_POOL_SIZE connections for GET requests (0 disables the split)
+    SQLITE_PROFILE_ENABLED = os.environ.get('SQLITE_PROFILE_ENABLED', 'true').lower() == 'true'
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', 'true').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16 * 1024))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))
+    SQLITE_READ_POOL_SIZE = int(os.environ.get('SQLITE_READ_POOL_SIZE', 8))
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(os.path.dirname(__file__), 'uploads')) 
+
+    # Response cache for public GET endpoints. Workers share invalidations
+    # through stamp files in RESPONSE_CACHE_STAMP_DIR (default: instance/cache-stamps);
+    # it must be writable and shared by every worker serving the same database.
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 256))
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 8 * 1024 * 1024))
+    RESPONSE_CACHE_STAMP_DIR = os.environ.get('RESPONSE_CACHE_STAMP_DIR')
+
+    # gzip/br compression of JSON and text responses of at least COMPRESS_MIN_SIZE
+    # bytes (br needs the brotli package). Cached responses keep their compressed
+    # bodies, so they are compressed once at the COMPRESS_CACHED_* levels.
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+    COMPRESS_CACHED_GZIP_LEVEL = int(os.environ.get('COMPRESS_CACHED_GZIP_LEVEL', 9))
+    COMPRESS_CACHED_BROTLI_QUALITY = int(os.environ.get('COMPRESS_CACHED_BROTLI_QUALITY', 9))
+
+    # Responsive image variants generated for project uploads
+    IMAGE_VARIANTS_ENABLED = os.environ.get('IMAGE_VARIANTS_ENABLED', 'true').lower() == 'true'
+    IMAGE_VARIANT_WIDTHS = [int(w) for w in os.environ.get('IMAGE_VARIANT_WIDTHS', '320,640,1024').split(',')]
+    IMAGE_VARIANT_QUALITY = int(os.environ.get('IMAGE_VARIANT_QUALITY', 80))
+    IMAGE_PROCESS_WORKERS = int(os.environ.get('IMAGE_PROCESS_WORKERS', 2))
+
+    # Garbage collection of unreferenced uploads. Worker processes share one pass per
+    # interval; 0 disables the scheduler (run `flask uploads-gc` from cron instead)
+    UPLOAD_GC_INTERVAL = int(os.environ.get('UPLOAD_GC_INTERVAL', 24 * 3600))
+    UPLOAD_GC_GRACE = int(os.environ.get('UPLOAD_GC_GRACE', 3600))
+
+    # Upload limits: MAX_CONTENT_LENGTH caps the whole request, MAX_UPLOAD_FILE_SIZE each file
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 64 * 1024 * 1024))
+    MAX_UPLOAD_FILE_SIZE = int(os.environ.get('MAX_UPLOAD_FILE_SIZE', 10 * 1024 * 1024))
+    UPLOAD_WRITE_WORKERS = int(os.environ.get('UPLOAD_WRITE_WORKERS', 4))
+
+    # Serving uploads: blob URLs never change content, so they are cached as immutable.
+    # UPLOAD_OFFLOAD hands transfers to the proxy: '' (serve from Python), 'x-accel-redirect' or 'x-sendfile'
+    UPLOAD_CACHE_MAX_AGE = int(os.environ.get('UPLOAD_CACHE_MAX_AGE', 365 * 24 * 3600))
+    UPLOAD_OFFLOAD = os.environ.get('UPLOAD_OFFLOAD', '')
+    UPLOAD_ACCEL_PREFIX = os.environ.get('UPLOAD_ACCEL_PREFIX', '/protected-uploads/')
+
+    # Verified admin tokens are cached for up to AUTH_CACHE_TTL seconds (never past their exp)
+    AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', 300))
+    AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', 1024))
+
+    # JSON encoder for responses: 'json' (stdlib) or 'orjson' (needs the orjson package)
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'json')
+
+    # Write-behind contact ingestion: POST /api/contacts queues messages and a
+    # background thread inserts them in batches of CONTACT_BATCH_SIZE, or every
+    # CONTACT_FLUSH_INTERVAL seconds. A full queue answers 503; unwritten messages
+    # are spooled to CONTACT_SPOOL_PATH (default: instance/contacts.spool).
+    CONTACT_WRITE_BEHIND = os.environ.get('CONTACT_WRITE_BEHIND', 'false').lower() == 'true'
+    CONTACT_QUEUE_MAX_SIZE = int(os.environ.get('CONTACT_QUEUE_MAX_SIZE', 1000))
+    CONTACT_BATCH_SIZE = int(os.environ.get('CONTACT_BATCH_SIZE', 100))
+    CONTACT_FLUSH_INTERVAL = float(os.environ.get('CONTACT_FLUSH_INTERVAL', 1.0))
+    CONTACT_SPOOL_PATH = os.environ.get('CONTACT_SPOOL_PATH')
+
+    # Full-text search ranks only the newest SEARCH_RANK_WINDOW matches per type,
+    # which keeps common terms fast on large tables (sort=recent is unbounded)
+    SEARCH_RANK_WINDOW = int(os.environ.get('SEARCH_RANK_WINDOW', 1000))
+
+    # Request, SQL and cache metrics served in the Prometheus text format at
+    # GET /api/metrics (admin token, or METRICS_TOKEN for scrapers). Requests
+    # slower than METRICS_SLOW_REQUEST_MS are logged with their slowest statements.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_SLOW_REQUEST_MS = int(os.environ.get('METRICS_SLOW_REQUEST_MS', 500))
+    METRICS_SLOW_STATEMENTS = int(os.environ.get('METRICS_SLOW_STATEMENTS', 5))
+
+    # Static export of the public GET routes for CDN hosting (`flask snapshot-export`).
+    # With SNAPSHOT_AUTO, admin writes re-export the affected files after SNAPSHOT_DELAY seconds.
+    SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR')
+    SNAPSHOT_AUTO = os.environ.get('SNAPSHOT_AUTO', 'false').lower() == 'true'
+    SNAPSHOT_DELAY = float(os.environ.get('SNAPSHOT_DELAY', 2.0))
+
+    # Server-Sent Events for the admin contact inbox (GET /api/contacts/events).
+    # One poller per process reads the change log every SSE_POLL_INTERVAL seconds
+    # (and right after local contact commits); streams send a heartbeat every
+    # SSE_HEARTBEAT seconds and close after SSE_MAX_STREAM_SECONDS so clients
+    # reconnect and re-authenticate. SSE_BACKLOG events are kept for fan-out.
+    # Browsers connect with a single-use ticket valid for SSE_TICKET_TTL seconds.
+    # Each open stream occupies a request thread for its whole life, so a process
+    # serves at most SSE_THREAD_SHARE of its SERVER_THREADS request threads as
+    # streams (and always leaves one for other requests); beyond that, clients
+    # get a 503 instead of queuing ahead of public requests. Set SERVER_THREADS
+    # to the server's threads per process (gunicorn --threads). Sync workers have
+    # one thread and serve no streams. On green-thread workers (gevent, eventlet),
+    # where an idle stream costs no OS thread, set SSE_MAX_CLIENTS instead.
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8))
+    SSE_THREAD_SHARE = float(os.environ.get('SSE_THREAD_SHARE', 0.25))
+    SSE_MAX_CLIENTS = int(os.environ.get('SSE_MAX_CLIENTS', 0))
+    SSE_BACKLOG = int(os.environ.get('SSE_BACKLOG', 1000))
+    SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', 1.0))
+    SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', 15.0))
+    SSE_MAX_STREAM_SECONDS = float(os.environ.get('SSE_MAX_STREAM_SECONDS', 600))
+    SSE_TICKET_TTL = int(os.environ.get('SSE_TICKET_TTL', 30))
+
+    # Durable background jobs (image variants, upload sidecars), stored in the
+    # job table and enqueued in the same transaction as the write they belong to.
+    # JOB_WORKERS threads run them in each app process; set it to 0 and run
+    # `flask jobs-work` for a dedicated worker process. A job whose worker dies
+    # is retried after JOB_LEASE_SECONDS; failures back off from JOB_RETRY_BASE
+    # seconds (doubling, capped at JOB_RETRY_MAX) for up to JOB_MAX_ATTEMPTS tries.
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 5.0))
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+    JOB_RETRY_BASE = float(os.environ.get('JOB_RETRY_BASE', 10.0))
+    JOB_RETRY_MAX = float(os.environ.get('JOB_RETRY_MAX', 3600.0))
+    JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', 7))
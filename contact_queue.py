@@ -0,0 +1,207 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('name', 'email', 'message')
+
+
+# Write-behind buffer for POST /api/contacts. Submissions are acknowledged once
+# queued; a flusher thread inserts them in batches so a burst costs one
+# transaction per batch instead of one per message. Anything that cannot reach
+# the database (shutdown, DB errors) is appended to a JSON-lines spool file and
+# replayed by the next flush.
+class ContactQueue:
+
+    def __init__(self, app=None):
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._spool_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        self.app = None
+        self.enabled = False
+        self.max_size = 1000
+        self.batch_size = 100
+        self.interval = 1.0
+        self.spool_path = None
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.batches = 0
+        self.spooled = 0
+        self.flush_seconds = 0.0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('CONTACT_WRITE_BEHIND', False)
+        self.max_size = app.config.get('CONTACT_QUEUE_MAX_SIZE', self.max_size)
+        self.batch_size = app.config.get('CONTACT_BATCH_SIZE', self.batch_size)
+        self.interval = app.config.get('CONTACT_FLUSH_INTERVAL', self.interval)
+        self.spool_path = app.config.get('CONTACT_SPOOL_PATH') or os.path.join(app.instance_path, 'contacts.spool')
+        app.extensions['contact_queue'] = self
+
+    # --- Producer side ---
+    def enqueue(self, name, email, message):
+        # Returns False when the queue is full so the caller can shed load
+        record = {'name': name, 'email': email, 'message': message, 'created_at': datetime.utcnow()}
+        self._ensure_flusher()
+        with self._cond:
+            if len(self._items) >= self.max_size:
+                self.rejected += 1
+                return False
+            self._items.append(record)
+            self.accepted += 1
+            # The first message starts the flusher's batch window; a full
+            # batch ends it early
+            if len(self._items) == 1 or len(self._items) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def depth(self):
+        return len(self._items)
+
+    def metrics(self):
+        return {
+            'enabled': self.enabled,
+            'depth': self.depth(),
+            'max_size': self.max_size,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'flushed': self.flushed,
+            'batches': self.batches,
+            'spooled': self.spooled,
+            'flush_seconds_total': round(self.flush_seconds, 6),
+            'flush_seconds_last': round(self.last_flush_seconds, 6),
+            'flush_seconds_max': round(self.max_flush_seconds, 6),
+        }
+
+    # --- Flusher ---
+    def _ensure_flusher(self):
+        # Threads do not survive a fork, so a worker starts its own on first use
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                self._items.clear()
+            self._stopping = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='contact-flusher', daemon=True)
+            self._thread.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._items and not self._stopping:
+                self._cond.wait()
+            # Hold the first message for at most `interval` while a batch fills
+            deadline = time.monotonic() + self.interval
+            while len(self._items) < self.batch_size and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(len(self._items), self.batch_size)
+            return [self._items.popleft() for _ in range(count)]
+
+    def _run(self):
+        self.replay_spool()
+        while True:
+            batch = self._next_batch()
+            if batch:
+                # The database is reachable again: messages spooled after an
+                # earlier failure (by this or another worker) go in now
+                if self.flush(batch) and os.path.exists(self.spool_path):
+                    self.replay_spool()
+            elif self._stopping:
+                return
+
+    def flush(self, batch):
+        from models import db, Contact
+        start = time.perf_counter()
+        try:
+            with self.app.app_context():
+                db.session.add_all(Contact(**record) for record in batch)
+                db.session.commit()
+        except Exception:
+            logger.exception('Failed to write %d queued contacts; spooling them', len(batch))
+            self.spool(batch)
+            return False
+        elapsed = time.perf_counter() - start
+        self.flushed += len(batch)
+        self.batches += 1
+        self.flush_seconds += elapsed
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        return True
+
+    def shutdown(self, timeout=10):
+        thread = self._thread
+        if thread is None or self._pid != os.getpid():
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        thread.join(timeout)
+        # Whatever the flusher could not take in time goes to the spool
+        with self._cond:
+            leftover = list(self._items)
+            self._items.clear()
+        if leftover:
+            self.spool(leftover)
+
+    # --- Durable fallback ---
+    def spool(self, batch):
+        lines = ''.join(
+            json.dumps({**record, 'created_at': record['created_at'].isoformat()}) + '\n'
+            for record in batch
+        )
+        with self._spool_lock:
+            os.makedirs(os.path.dirname(self.spool_path), exist_ok=True)
+            with open(self.spool_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+        self.spooled += len(batch)
+
+    def replay_spool(self):
+        # Claim the spool by renaming it, so concurrent workers never replay
+        # the same messages twice
+        claimed = f"{self.spool_path}.{os.getpid()}.replay"
+        try:
+            with self._spool_lock:
+                os.replace(self.spool_path, claimed)
+        except FileNotFoundError:
+            return 0
+        records = []
+        with open(claimed, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                    record = {k: data[k] for k in FIELDS}
+                    record['created_at'] = datetime.fromisoformat(data['created_at'])
+                except (ValueError, KeyError, TypeError):
+                    logger.warning('Skipping malformed line in contact spool')
+                    continue
+                records.append(record)
+        # Failed batches are spooled again, so the claimed file can go
+        for start in range(0, len(records), self.batch_size):
+            self.flush(records[start:start + self.batch_size])
+        os.remove(claimed)
+        return len(records)
+
+
+contact_queue = ContactQueue()
+atexit.register(contact_queue.shutdown)
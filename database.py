@@ -0,0 +1,168 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+
+READ_BIND = 'reader'
+READ_METHODS = ('GET', 'HEAD')
+_reading = ContextVar('reading', default=False)
+
+
+# Sends ORM reads made while handling GET/HEAD requests to the read-only pool.
+# Flushes, and anything outside a GET request (writes, CLI commands, background
+# threads), use the default engine, which is the single writer; read-only
+# background work opts in to the pool with `reading()`.
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and use_reader():
+            reader = self._db.engines.get(READ_BIND)
+            if reader is not None:
+                return reader
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def use_reader():
+    return _reading.get() or (has_request_context() and request.method in READ_METHODS)
+
+
+@contextmanager
+def reading():
+    # Routes the current thread's ORM reads to the read-only pool
+    token = _reading.set(True)
+    try:
+        yield
+    finally:
+        _reading.reset(token)
+
+
+def is_file_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:') \
+        and not url.database.startswith('file::memory:')
+
+
+# --- Portable writes ---
+# Dialects with INSERT ... ON CONFLICT DO NOTHING
+UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def insert_ignore(db, table, values, key=None):
+    # Inserts a row into a Core table unless one with the same unique `key`
+    # column exists; returns True when inserted. Always runs on the writer.
+    # Without ON CONFLICT support the lookup happens first in the same write
+    # transaction, and a concurrent duplicate fails on the unique constraint.
+    session = db.session
+    bind = db.engine
+    options = {'bind_arguments': {'bind': bind}}
+    if key is None:
+        session.execute(table.insert().values(**values), **options)
+        return True
+    dialect_insert = UPSERT_DIALECTS.get(bind.dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(table).values(**values).on_conflict_do_nothing(index_elements=[key])
+        return session.execute(statement, **options).rowcount > 0
+    column = table.c[key]
+    if session.execute(select(column).where(column == values[key]), **options).first() is not None:
+        return False
+    session.execute(table.insert().values(**values), **options)
+    return True
+
+
+# --- Engine profile ---
+def configure(app):
+    # Call before db.init_app(): fills in engine options and the reader bind
+    config = app.config
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if not config.get('SQLITE_PROFILE_ENABLED', True) or not is_file_sqlite(uri):
+        return
+    # Waits for the busy timeout in SQLite first; the pool wait covers the
+    # in-process queue for the single writer connection
+    pool_timeout = max(config['SQLITE_BUSY_TIMEOUT'] / 1000.0, 1) * 2
+    writer = config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    writer.setdefault('pool_size', 1)
+    writer.setdefault('max_overflow', 0)
+    writer.setdefault('pool_timeout', pool_timeout)
+    writer.setdefault('connect_args', {}).setdefault('check_same_thread', False)
+    if config.get('SQLITE_READ_POOL_SIZE', 0) > 0:
+        binds = config.setdefault('SQLALCHEMY_BINDS', {})
+        binds.setdefault(READ_BIND, {
+            'url': uri,
+            'pool_size': config['SQLITE_READ_POOL_SIZE'],
+            'max_overflow': 0,
+            'pool_timeout': pool_timeout,
+            'connect_args': {'check_same_thread': False},
+        })
+
+
+def install(app, db):
+    # Call after db.init_app(): registers the per-connection pragmas
+    if not app.config.get('SQLITE_PROFILE_ENABLED', True) or not is_file_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    with app.app_context():
+        engines = db.engines
+    _listen(engines[None], app.config, readonly=False)
+    if READ_BIND in engines:
+        _listen(engines[READ_BIND], app.config, readonly=True)
+
+
+def _pragmas(config, readonly):
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT'])}",
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA cache_size = -{int(config['SQLITE_CACHE_SIZE_KB'])}",
+        f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+        'PRAGMA temp_store = MEMORY',
+    ]
+    if config['SQLITE_WAL'] and not readonly:
+        pragmas.insert(0, 'PRAGMA journal_mode = WAL')
+    if readonly:
+        pragmas.append('PRAGMA query_only = ON')
+    return pragmas
+
+
+def _listen(engine, config, readonly):
+    pragmas = _pragmas(config, readonly)
+    # The writer takes the write lock when its transaction starts, so it waits
+    # on busy_timeout up front instead of failing on a read-to-write upgrade
+    begin = 'BEGIN' if readonly else 'BEGIN IMMEDIATE'
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        # Let SQLAlchemy issue BEGIN itself instead of pysqlite's implicit one
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def _on_begin(conn):
+        conn.exec_driver_sql(begin)
+
+
+# --- Pre-fork servers ---
+_fork_engines = []
+
+
+def prepare_fork(app, db):
+    # Call at the end of create_app(). Connections opened during startup are
+    # closed so a preloading server forks with empty pools, and each child
+    # drops whatever pool state it inherits without touching the parent's
+    # connections (dispose(close=False)).
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        engine.dispose()
+    if not _fork_engines:
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+    _fork_engines.extend(e for e in engines if e not in _fork_engines)
+
+
+def _after_fork_in_child():
+    for engine in _fork_engines:
+        engine.dispose(close=False)
@@ -0,0 +1,159 @@
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+
+from jobs import enqueue, handler
+from models import db, ProjectImage, ProjectImageVariant
+from storage import EXTENSIONS, RASTER_TYPES, url_to_path
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMATS = {
+    'JPEG': ('image/jpeg', '.jpg'),
+    'PNG': ('image/png', '.png'),
+    'WEBP': ('image/webp', '.webp'),
+}
+# Images Pillow can resize, by URL extension ('.jpeg' from older uploads)
+RASTER_EXTENSIONS = frozenset({EXTENSIONS[t] for t in RASTER_TYPES} | {'.jpeg'})
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _reset_pool():
+    # A forked worker must not share the parent's pool processes or its lock
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_pool)
+
+
+# --- Worker side (runs in the process pool) ---
+def save_atomic(image, path, fmt, **options):
+    # Identical uploads share a blob, so two workers may render the same
+    # variant at once; readers must never see a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    image.save(tmp_path, fmt, **options)
+    os.replace(tmp_path, path)
+
+
+def render_variants(path, widths, quality):
+    # Imported here so the app still starts without Pillow installed
+    from PIL import Image, ImageOps
+    stem, _ = os.path.splitext(path)
+    with Image.open(path) as source:
+        source_format = source.format if source.format in VARIANT_FORMATS else 'JPEG'
+        image = ImageOps.exif_transpose(source)
+        if source_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        width, height = image.size
+        variants = []
+        for target in sorted(set(w for w in widths if w < width)):
+            resized = image.resize((target, round(height * target / width)), Image.LANCZOS)
+            for fmt in (source_format, 'WEBP'):
+                _, ext = VARIANT_FORMATS[fmt]
+                out = f"{stem}_{target}w{ext}"
+                options = {'optimize': True} if fmt == 'PNG' else {'quality': quality}
+                save_atomic(resized, out, fmt, **options)
+                variants.append({
+                    'filename': os.path.basename(out),
+                    'width': resized.width,
+                    'height': resized.height,
+                    'mimetype': VARIANT_FORMATS[fmt][0],
+                })
+        # Full-size copy in the modern format as well
+        out = f"{stem}.webp"
+        if source_format != 'WEBP':
+            save_atomic(image, out, 'WEBP', quality=quality)
+            variants.append({'filename': os.path.basename(out), 'width': width,
+                             'height': height, 'mimetype': 'image/webp'})
+    return {'width': width, 'height': height, 'variants': variants}
+
+
+# --- App side ---
+def is_raster(image):
+    return os.path.splitext(image.url)[1].lower() in RASTER_EXTENSIONS
+
+
+def get_pool(app):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=app.config['IMAGE_PROCESS_WORKERS'])
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+def store_variants(image_id, result):
+    image = db.session.get(ProjectImage, image_id)
+    if image is None:
+        # Replaced or deleted while processing
+        return False
+    image.width = result['width']
+    image.height = result['height']
+    # Variants are written next to the source file
+    base_url = image.url.rsplit('/', 1)[0]
+    image.variants = [
+        ProjectImageVariant(url=f"{base_url}/{v['filename']}", width=v['width'],
+                            height=v['height'], mimetype=v['mimetype'])
+        for v in result['variants']
+    ]
+    db.session.commit()
+    return True
+
+
+def submit_image(app, image):
+    return get_pool(app).submit(render_variants, url_to_path(image.url),
+                                app.config['IMAGE_VARIANT_WIDTHS'], app.config['IMAGE_VARIANT_QUALITY'])
+
+
+def queue_image_variants(images):
+    # Call before committing the images: the jobs commit with them, so
+    # variants are generated for exactly the images that were stored
+    if not current_app.config['IMAGE_VARIANTS_ENABLED'] or not images:
+        return
+    db.session.flush()
+    for image in images:
+        if not is_raster(image):
+            continue
+        enqueue('image_variants', {'image_id': image.id}, key=f"image_variants:{image.id}")
+
+
+@handler('image_variants')
+def generate_variants(image_id):
+    image = db.session.get(ProjectImage, image_id)
+    if image is None or not is_raster(image):
+        # Replaced or deleted before the job ran, or a vector image
+        return
+    future = submit_image(current_app._get_current_object(), image)
+    # Job workers write through the single writer connection; release it
+    # while the pool renders
+    db.session.commit()
+    store_variants(image_id, future.result())
+
+
+def process_images_now(images):
+    # Blocking variant of the image_variants job, used for backfills
+    app = current_app._get_current_object()
+    futures = [(image.id, submit_image(app, image)) for image in images if is_raster(image)]
+    processed = 0
+    for image_id, future in futures:
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.warning('Variant generation failed for image %s: %s', image_id, e)
+            continue
+        processed += store_variants(image_id, result)
+    return processed
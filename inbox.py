@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from flask import Response
+
+from cache import response_cache
+from database import reading
+from models import Contact
+
+logger = logging.getLogger(__name__)
+
+RESOURCE = 'contact'
+# Change log entries read per query by the poller and by catch-up reads
+FETCH_SIZE = 500
+
+
+def encode_event(item):
+    # One SSE message: the change log seq is the event id, so a reconnecting
+    # client's Last-Event-ID resumes exactly after the last change it saw
+    return (f"id: {item['seq']}\nevent: {item['op']}\n"
+            f"data: {json.dumps(item, separators=(',', ':'))}\n\n").encode()
+
+
+def max_streams(threads, share):
+    # Streams a threaded worker can hold open without starving other requests
+    return max(0, min(int(threads * share), threads - 1))
+
+
+# Pushes contact inbox changes (new messages, read-state changes, deletions)
+# to admin EventSource clients. One poller thread per process reads the
+# change log after each local contact commit (through the response cache's
+# invalidation listeners) and every SSE_POLL_INTERVAL seconds for commits
+# made by other processes, then fans the encoded events out to every stream
+# from a shared backlog. The poller and catch-up reads use the read-only pool.
+# An idle stream costs a wait on that condition and one authorization check
+# per heartbeat; a stream whose login was revoked is closed at its next check,
+# and every stream ends after SSE_MAX_STREAM_SECONDS so clients reconnect
+# (and re-authenticate) with their Last-Event-ID. A stream still holds a
+# request thread while open, so they are capped per process (see max_streams).
+class ContactInbox:
+
+    def __init__(self, app=None):
+        self._cond = threading.Condition()
+        self._wakeup = threading.Event()
+        self._events = deque()
+        # Every change after _floor is in _events; older ones are read from the log
+        self._floor = None
+        self._last_seq = None
+        self._thread = None
+        self._pid = None
+        self.app = None
+        self.subscribers = 0
+        self.max_clients = 2
+        self.backlog = 1000
+        self.poll_interval = 1.0
+        self.heartbeat = 15.0
+        self.max_stream_seconds = 600.0
+        self.retry_ms = 3000
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_clients = app.config.get('SSE_MAX_CLIENTS') or max_streams(
+            app.config.get('SERVER_THREADS', 8), app.config.get('SSE_THREAD_SHARE', 0.25))
+        self.backlog = app.config.get('SSE_BACKLOG', self.backlog)
+        self.poll_interval = app.config.get('SSE_POLL_INTERVAL', self.poll_interval)
+        self.heartbeat = app.config.get('SSE_HEARTBEAT', self.heartbeat)
+        self.max_stream_seconds = app.config.get('SSE_MAX_STREAM_SECONDS', self.max_stream_seconds)
+        app.extensions['contact_inbox'] = self
+        if self.on_invalidate not in response_cache.listeners:
+            response_cache.listeners.append(self.on_invalidate)
+
+    def on_invalidate(self, tables):
+        # Runs inside the committing session: only wakes the poller
+        if Contact.__tablename__ in tables and self.subscribers:
+            self._wakeup.set()
+
+    # --- Poller ---
+    def _ensure_poller(self):
+        # Threads do not survive a fork, so a worker starts its own on first use
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._events.clear()
+            self._floor = self._last_seq = None
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='contact-inbox', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            # Without subscribers the poller sleeps until one connects
+            self._wakeup.wait(self.poll_interval if self.subscribers else None)
+            self._wakeup.clear()
+            if not self.subscribers:
+                continue
+            try:
+                self._poll()
+            except Exception:
+                logger.exception('Contact inbox poll failed')
+                time.sleep(self.poll_interval)
+
+    def _poll(self):
+        import changes
+        with self.app.app_context(), reading():
+            if self._last_seq is None:
+                self._last_seq = changes.latest_seq()
+                with self._cond:
+                    self._floor = self._last_seq
+                return
+            has_more = True
+            while has_more:
+                items, has_more = changes.feed(self._last_seq, FETCH_SIZE, [RESOURCE])
+                if not items:
+                    return
+                self._last_seq = items[-1]['seq']
+                with self._cond:
+                    for item in items:
+                        if len(self._events) >= self.backlog:
+                            self._floor = self._events.popleft()[0]
+                        self._events.append((item['seq'], encode_event(item)))
+                    self._cond.notify_all()
+
+    # --- Streams ---
+    def _events_after(self, since):
+        # Encoded events after `since` and the seq to continue from. Clients
+        # behind the shared backlog catch up from the change log directly.
+        with self._cond:
+            floor = self._floor
+            if floor is not None and since >= floor:
+                events = [(seq, data) for seq, data in self._events if seq > since]
+                return [data for _, data in events], events[-1][0] if events else since
+        import changes
+        with self.app.app_context(), reading():
+            items, has_more = changes.feed(since, FETCH_SIZE, [RESOURCE])
+        since = items[-1]['seq'] if items else since
+        if not has_more and floor is not None:
+            # Caught up to a read made after the floor was set: the backlog
+            # holds everything from here on
+            since = max(since, floor)
+        return [encode_event(item) for item in items], since
+
+    def _wait(self, since, timeout):
+        # True when events after `since` arrived before the timeout
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._events and self._events[-1][0] > since, timeout)
+
+    def _authorized(self, check):
+        try:
+            with self.app.app_context(), reading():
+                return check()
+        except Exception:
+            logger.exception('Contact stream authorization check failed')
+            return False
+
+    def stream(self, since, resumed, check=None):
+        # `check` re-validates the subscriber's login once per heartbeat
+        deadline = time.monotonic() + self.max_stream_seconds
+        next_check = time.monotonic() + self.heartbeat
+        yield f"retry: {self.retry_ms}\n\n".encode()
+        if not resumed:
+            # Gives a fresh client an id to resume from without replaying the inbox
+            yield f"id: {since}\nevent: ready\ndata: {{}}\n\n".encode()
+        while True:
+            events, since = self._events_after(since)
+            for data in events:
+                yield data
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if check is not None and time.monotonic() >= next_check:
+                if not self._authorized(check):
+                    return
+                next_check = time.monotonic() + self.heartbeat
+            # Heartbeats keep proxies from closing the connection and surface
+            # disconnected clients as failed writes
+            if not events and not self._wait(since, min(self.heartbeat, remaining)):
+                yield b': heartbeat\n\n'
+
+    def _unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+
+    def response(self, since, resumed, check=None):
+        # None when this process already serves max_clients streams
+        self._ensure_poller()
+        with self._cond:
+            if self.subscribers >= self.max_clients:
+                return None
+            self.subscribers += 1
+        self._wakeup.set()
+        response = Response(self.stream(since, resumed, check), mimetype='text/event-stream')
+        # Runs when the server closes the stream, even if it never started
+        response.call_on_close(self._unsubscribe)
+        response.headers['Cache-Control'] = 'no-cache'
+        # Stops nginx from buffering the stream
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+
+contact_inbox = ContactInbox()
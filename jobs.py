@@ -0,0 +1,297 @@
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from database import insert_ignore
+from models import db, Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Job type -> function called with the payload as keyword arguments
+HANDLERS = {}
+# Queue statements go through the Core table rather than the model, so the
+# response cache's write tracking never sees them: claiming and finishing
+# jobs must not invalidate cached responses or wake anything
+table = Job.__table__
+
+
+def handler(name):
+    # Registers a job type. Jobs run at least once (a worker that dies
+    # mid-job leaves it to be retried when its lease expires), so handlers
+    # must be safe to repeat.
+    def register(fn):
+        HANDLERS[name] = fn
+        return fn
+    return register
+
+
+# --- Queue ---
+def enqueue(job_type, payload=None, key=None, delay=0, max_attempts=None):
+    # Inserts the job in the caller's transaction: workers see it only once
+    # the write it belongs to commits, and a rollback drops it. With a key,
+    # a job already enqueued under that key wins. Returns True when inserted.
+    if job_type not in HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+    now = datetime.utcnow()
+    values = dict(
+        type=job_type, payload=json.dumps(payload or {}, sort_keys=True), key=key, status=QUEUED, attempts=0,
+        max_attempts=max_attempts or job_runner.max_attempts, run_at=now + timedelta(seconds=delay),
+        created_at=now)
+    inserted = insert_ignore(db, table, values, 'key' if key is not None else None)
+    if inserted:
+        # Workers in this process are woken once the transaction commits
+        db.session.info['jobs_enqueued'] = True
+    return inserted
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_on_commit(session):
+    if session.info.pop('jobs_enqueued', False):
+        job_runner.wake()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('jobs_enqueued', None)
+
+
+def claim(worker, lease_seconds):
+    # Takes the next due job, or a running one whose lease expired, in one
+    # UPDATE; SQLite's single writer makes the claim atomic across processes
+    now = datetime.utcnow()
+    due = (select(table.c.id).where(table.c.status.in_((QUEUED, RUNNING)), table.c.run_at <= now)
+           .order_by(table.c.run_at, table.c.id).limit(1).scalar_subquery())
+    job = db.session.execute(
+        table.update().where(table.c.id == due)
+        .values(status=RUNNING, attempts=table.c.attempts + 1, locked_by=worker,
+                run_at=now + timedelta(seconds=lease_seconds))
+        .returning(table.c.id, table.c.type, table.c.payload, table.c.attempts, table.c.max_attempts)
+    ).first()
+    if job is None:
+        # Nothing was written; don't commit an empty write transaction
+        db.session.rollback()
+        return None
+    db.session.commit()
+    return job
+
+
+def finish(job, worker, error=None, retry_delay=0):
+    # Returns the job's new status; None when the lease was lost to another worker
+    now = datetime.utcnow()
+    if error is None:
+        status, values = DONE, {'finished_at': now, 'last_error': None}
+    elif job.attempts < job.max_attempts:
+        status, values = QUEUED, {'run_at': now + timedelta(seconds=retry_delay), 'last_error': error}
+    else:
+        status, values = FAILED, {'finished_at': now, 'last_error': error}
+    result = db.session.execute(
+        table.update().where(table.c.id == job.id, table.c.status == RUNNING, table.c.locked_by == worker)
+        .values(status=status, locked_by=None, **values)
+    )
+    db.session.commit()
+    return status if result.rowcount else None
+
+
+def retry(job):
+    # Puts a failed job back in the queue with a fresh set of attempts
+    job.status = QUEUED
+    job.attempts = 0
+    job.run_at = datetime.utcnow()
+    job.finished_at = None
+    db.session.commit()
+
+
+def prune(retention_days):
+    # Completed jobs are kept for a while so their keys keep deduplicating
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    result = db.session.execute(
+        table.delete().where(table.c.status == DONE, table.c.finished_at < cutoff))
+    db.session.commit()
+    return result.rowcount
+
+
+def queue_stats(failures=20):
+    now = datetime.utcnow()
+    by_type = {}
+    totals = Counter()
+    for job_type, status, count in db.session.execute(
+            select(Job.type, Job.status, func.count()).group_by(Job.type, Job.status)):
+        by_type.setdefault(job_type, {})[status] = count
+        totals[status] += count
+    oldest_due = db.session.execute(
+        select(func.min(Job.run_at)).where(Job.status == QUEUED, Job.run_at <= now)).scalar()
+    retrying = db.session.execute(
+        select(func.count()).select_from(Job).where(Job.status == QUEUED, Job.attempts > 0)).scalar()
+    failed = Job.query.filter_by(status=FAILED).order_by(Job.finished_at.desc(), Job.id.desc()).limit(failures)
+    return {
+        'depth': totals[QUEUED] + totals[RUNNING],
+        'queued': totals[QUEUED],
+        'running': totals[RUNNING],
+        'retrying': retrying,
+        'failed': totals[FAILED],
+        'done': totals[DONE],
+        # How long the oldest due job has been waiting for a worker
+        'lag_seconds': round((now - oldest_due).total_seconds(), 3) if oldest_due else 0,
+        'by_type': by_type,
+        'failures': [{
+            'id': job.id,
+            'type': job.type,
+            'key': job.key,
+            'payload': json.loads(job.payload),
+            'attempts': job.attempts,
+            'error': job.last_error,
+            'created_at': job.created_at.isoformat(),
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        } for job in failed],
+        'workers': job_runner.metrics(),
+    }
+
+
+# Runs queued jobs on JOB_WORKERS threads in each app process, or in a
+# dedicated process (`flask jobs-work`) when JOB_WORKERS is 0. Workers sleep
+# up to JOB_POLL_INTERVAL seconds between polls; commits that enqueue jobs in
+# this process wake them at once. Failed jobs are retried with exponential
+# backoff until they run out of attempts.
+class JobRunner:
+
+    def __init__(self, app=None):
+        self._cond = threading.Condition()
+        self._threads = []
+        self._pid = None
+        self._last_prune = 0.0
+        self.app = None
+        self.workers = 2
+        self.poll_interval = 5.0
+        self.lease_seconds = 300
+        self.max_attempts = 5
+        self.retry_base = 10.0
+        self.retry_max = 3600.0
+        self.retention_days = 7
+        self.completed = Counter()
+        self.retried = Counter()
+        self.failed = Counter()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get('JOB_WORKERS', self.workers)
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', self.poll_interval)
+        self.lease_seconds = app.config.get('JOB_LEASE_SECONDS', self.lease_seconds)
+        self.max_attempts = app.config.get('JOB_MAX_ATTEMPTS', self.max_attempts)
+        self.retry_base = app.config.get('JOB_RETRY_BASE', self.retry_base)
+        self.retry_max = app.config.get('JOB_RETRY_MAX', self.retry_max)
+        self.retention_days = app.config.get('JOB_RETENTION_DAYS', self.retention_days)
+        app.extensions['jobs'] = self
+        if self.workers > 0:
+            # Started by the first request so a preloading server's workers
+            # each run their own threads after the fork
+            app.before_request(self._ensure_workers)
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _ensure_workers(self):
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = []
+        self.start(self.workers)
+
+    def start(self, count):
+        for index in range(count):
+            worker = f"{socket.gethostname()}:{os.getpid()}:{len(self._threads) + 1}"
+            thread = threading.Thread(target=self._run, args=(worker,), name=f"job-worker-{index + 1}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+        return self._threads
+
+    def _run(self, worker):
+        while True:
+            try:
+                ran = self.run_once(worker)
+            except Exception:
+                logger.exception('Job worker %s failed to poll', worker)
+                ran = False
+            if not ran:
+                self._maybe_prune()
+                with self._cond:
+                    self._cond.wait(self.poll_interval)
+
+    def backoff(self, attempts):
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        # Jitter spreads out retries of jobs that failed together
+        return delay * random.uniform(1.0, 1.2)
+
+    def run_once(self, worker):
+        # Claims and runs one job; False when nothing was due
+        with self.app.app_context():
+            job = claim(worker, self.lease_seconds)
+        if job is None:
+            return False
+        start = time.perf_counter()
+        error = None
+        if job.attempts > job.max_attempts:
+            # The lease of the final attempt expired: the worker died running it
+            error = 'Worker lost on the final attempt'
+        elif job.type not in HANDLERS:
+            error = f"No handler for job type {job.type}"
+        else:
+            try:
+                with self.app.app_context():
+                    HANDLERS[job.type](**json.loads(job.payload))
+            except Exception as e:
+                logger.exception('Job %s (%s) failed on attempt %d', job.id, job.type, job.attempts)
+                error = f"{type(e).__name__}: {e}"
+        with self.app.app_context():
+            status = finish(job, worker, error, self.backoff(job.attempts))
+        if status == DONE:
+            self.completed[job.type] += 1
+        elif status == QUEUED:
+            self.retried[job.type] += 1
+        elif status == FAILED:
+            self.failed[job.type] += 1
+            logger.error('Job %s (%s) failed after %d attempts: %s', job.id, job.type, job.attempts, error)
+        else:
+            logger.warning('Job %s (%s) lease expired before it finished; another worker has it',
+                           job.id, job.type)
+        logger.debug('Job %s (%s) %s in %.1f ms', job.id, job.type, status, (time.perf_counter() - start) * 1000)
+        return True
+
+    def _maybe_prune(self):
+        if time.monotonic() - self._last_prune < 3600:
+            return
+        self._last_prune = time.monotonic()
+        with self.app.app_context():
+            removed = prune(self.retention_days)
+        if removed:
+            logger.info('Pruned %d completed jobs', removed)
+
+    def metrics(self):
+        return {
+            'threads': sum(thread.is_alive() for thread in self._threads),
+            'completed': dict(self.completed),
+            'retried': dict(self.retried),
+            'failed': dict(self.failed),
+        }
+
+
+job_runner = JobRunner()
@@ -0,0 +1,288 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# Statements kept per request for the slow-request log; the count is always exact
+MAX_RECORDED_STATEMENTS = 50
+MAX_STATEMENT_CHARS = 300
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6)) if value != int(value) else str(int(value))
+    return str(value)
+
+
+# In-process request metrics in the Prometheus text format. Request timings,
+# SQL statements (from engine events) and response sizes are recorded per
+# endpoint; cache and queue counters are read from their owners at scrape
+# time. Every process keeps its own numbers, so each worker is a scrape target.
+class Metrics:
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._sources = []
+        self.enabled = True
+        self.slow_request_seconds = 0.5
+        self.slow_statements = 5
+        self.started_at = time.time()
+        # Cold start: create_app() duration, and time from the start of
+        # create_app() (or from the fork, in a preloaded worker) to the first
+        # response this process sends
+        self.boot_started = None
+        self.startup_seconds = None
+        self.first_request_seconds = None
+        self.schema_state = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.slow_request_seconds = app.config.get('METRICS_SLOW_REQUEST_MS', 500) / 1000.0
+        self.slow_statements = app.config.get('METRICS_SLOW_STATEMENTS', self.slow_statements)
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    # --- Recording ---
+    def observe(self, name, labels, value, buckets):
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels=(), amount=1):
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + amount
+
+    def observe_upload(self, files, size, seconds):
+        if not self.enabled:
+            return
+        self.inc('upload_files_total', (), files)
+        self.inc('upload_bytes_total', (), size)
+        self.observe('upload_duration_seconds', (), seconds, DURATION_BUCKETS)
+
+    def mark_started(self, boot_started, schema_state):
+        self.boot_started = boot_started
+        self.startup_seconds = time.perf_counter() - boot_started
+        self.schema_state = schema_state
+        logger.info('App created in %.1f ms (schema %s)', self.startup_seconds * 1000, schema_state)
+
+    def _after_fork(self):
+        self.started_at = time.time()
+        self.boot_started = time.perf_counter()
+        self.first_request_seconds = None
+
+    def register_source(self, fn):
+        # fn() returns [(name, type, help, [(labels dict, value)])] at scrape time
+        self._sources.append(fn)
+        return fn
+
+    # --- Request hooks ---
+    @staticmethod
+    def _start_request():
+        g.metrics_start = time.perf_counter()
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+        g.sql_statements = []
+
+    def _finish_request(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        # Unmatched URLs share one label so 404 probes cannot grow the registry
+        labels = (request.endpoint or 'unmatched', request.method, response.status_code)
+        sql_count, sql_seconds = g.sql_count, g.sql_seconds
+        size = response.calculate_content_length() if not response.is_streamed else response.content_length
+        with self._lock:
+            for name, value, buckets in (('http_request_duration_seconds', elapsed, DURATION_BUCKETS),
+                                         ('http_request_sql_statements', sql_count, QUERY_BUCKETS),
+                                         ('http_response_size_bytes', size, SIZE_BUCKETS)):
+                if value is None:
+                    continue
+                histogram = self._histograms.get((name, labels))
+                if histogram is None:
+                    histogram = self._histograms[(name, labels)] = Histogram(buckets)
+                histogram.observe(value)
+            key = ('http_request_sql_seconds_total', labels)
+            self._counters[key] = self._counters.get(key, 0) + sql_seconds
+        if self.first_request_seconds is None and self.boot_started is not None:
+            self.first_request_seconds = time.perf_counter() - self.boot_started
+            logger.info('First request served %.1f ms after start', self.first_request_seconds * 1000)
+        if elapsed >= self.slow_request_seconds:
+            self._log_slow(labels, elapsed, sql_count, sql_seconds, g.sql_statements)
+        return response
+
+    def _log_slow(self, labels, elapsed, sql_count, sql_seconds, statements):
+        endpoint, method, status = labels
+        slowest = sorted(statements, key=lambda s: s[1], reverse=True)[:self.slow_statements]
+        logger.warning('Slow request %s %s (%s) %d in %.1f ms: %d statements, %.1f ms in SQL%s',
+                       method, request.path, endpoint, status, elapsed * 1000, sql_count, sql_seconds * 1000,
+                       ''.join(f"\n  {seconds * 1000:8.1f} ms  {statement}" for statement, seconds in slowest))
+
+    # --- Exposition ---
+    def render(self):
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+        lines = []
+        histogram_labels = ('endpoint', 'method', 'status')
+        for name, help_text in HISTOGRAM_HELP.items():
+            series = sorted((labels, data) for (n, labels), data in histograms.items() if n == name)
+            if not series:
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            names = histogram_labels if series[0][0] else ()
+            for labels, (counts, total, count, buckets) in series:
+                cumulative = 0
+                for bound, n in zip(buckets + (None,), counts):
+                    cumulative += n
+                    le = 'le="%s"' % ('+Inf' if bound is None else _number(bound))
+                    lines.append(f"{name}_bucket{_labels(names, labels, [le])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(names, labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(names, labels)} {count}")
+        for name, help_text in COUNTER_HELP.items():
+            series = sorted((labels, value) for (n, labels), value in counters.items() if n == name)
+            if not series:
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            names = histogram_labels if series[0][0] else ()
+            lines += [f"{name}{_labels(names, labels)} {_number(value)}" for labels, value in series]
+        for source in self._sources:
+            for name, kind, help_text, samples in source():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}"
+                          for labels, value in samples]
+        lines += ['# HELP process_start_time_seconds Start time of the process since the epoch.',
+                  '# TYPE process_start_time_seconds gauge',
+                  f"process_start_time_seconds {_number(self.started_at)}"]
+        return '\n'.join(lines) + '\n'
+
+
+HISTOGRAM_HELP = {
+    'http_request_duration_seconds': 'Time spent handling the request, by endpoint, method and status.',
+    'http_request_sql_statements': 'SQL statements executed per request.',
+    'http_response_size_bytes': 'Response body size.',
+    'upload_duration_seconds': 'Time spent validating and storing the files of one request.',
+}
+COUNTER_HELP = {
+    'http_request_sql_seconds_total': 'Time spent executing SQL statements.',
+    'upload_files_total': 'Uploaded files stored.',
+    'upload_bytes_total': 'Uploaded bytes stored.',
+}
+
+metrics = Metrics()
+os.register_at_fork(after_in_child=metrics._after_fork)
+
+
+# --- SQL statements ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['metrics_start'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop('metrics_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    if has_request_context() and 'sql_count' in g:
+        g.sql_count += 1
+        g.sql_seconds += elapsed
+        if len(g.sql_statements) < MAX_RECORDED_STATEMENTS:
+            g.sql_statements.append((statement[:MAX_STATEMENT_CHARS], elapsed))
+
+
+# --- Startup, cache and queue ---
+@metrics.register_source
+def _startup_samples():
+    samples = [('app_startup_seconds', 'gauge', 'Time create_app() took in this process.',
+                [({'schema': metrics.schema_state}, metrics.startup_seconds)]),
+               ('app_first_request_seconds', 'gauge', 'Time from start (or fork) to the first response.',
+                [({}, metrics.first_request_seconds)])]
+    return [sample for sample in samples if sample[3][0][1] is not None]
+
+
+@metrics.register_source
+def _cache_samples():
+    from auth import token_cache
+    from cache import response_cache
+    caches = {'response': response_cache, 'token': token_cache}
+    return [
+        ('cache_hits_total', 'counter', 'Cache lookups that returned an entry.',
+         [({'cache': name}, cache.hits) for name, cache in caches.items()]),
+        ('cache_misses_total', 'counter', 'Cache lookups that found nothing usable.',
+         [({'cache': name}, cache.misses) for name, cache in caches.items()]),
+        ('cache_entries', 'gauge', 'Entries currently cached.',
+         [({'cache': name}, len(cache)) for name, cache in caches.items()]),
+    ]
+
+
+@metrics.register_source
+def _contact_queue_samples():
+    from contact_queue import contact_queue
+    if not contact_queue.enabled:
+        return []
+    stats = contact_queue.metrics()
+    return [
+        ('contact_queue_depth', 'gauge', 'Contacts waiting to be written.', [({}, stats['depth'])]),
+        ('contact_queue_accepted_total', 'counter', 'Contacts queued.', [({}, stats['accepted'])]),
+        ('contact_queue_rejected_total', 'counter', 'Contacts refused because the queue was full.',
+         [({}, stats['rejected'])]),
+        ('contact_queue_flushed_total', 'counter', 'Contacts written by the flusher.', [({}, stats['flushed'])]),
+        ('contact_queue_flush_seconds_total', 'counter', 'Time spent writing batches.',
+         [({}, stats['flush_seconds_total'])]),
+    ]
+
+
+@metrics.register_source
+def _job_samples():
+    from jobs import job_runner
+    counters = (('jobs_completed_total', 'Jobs that succeeded.', job_runner.completed),
+                ('jobs_retried_total', 'Failed job attempts scheduled for a retry.', job_runner.retried),
+                ('jobs_failed_total', 'Jobs that ran out of attempts.', job_runner.failed))
+    return [(name, 'counter', help_text, [({'type': job_type}, count) for job_type, count in sorted(counter.items())])
+            for name, help_text, counter in counters if counter]
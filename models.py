@@ -7,6 +7,16 @@ class User(db.Model):
     password_hash = db.Column(db.String(120), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on password change; tokens carrying an older version are rejected
+    token_version = db.Column(db.Integer, default=0)
+
+class RevokedToken(db.Model):
+    __table_args__ = (
+        db.Index('ix_revoked_token_expires_at', 'expires_at'),
+    )
+    jti = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
 
 class Profile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -25,6 +35,9 @@ class Profile(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Skill(db.Model):
+    __table_args__ = (
+        db.Index('ix_skill_order', 'order'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     icon = db.Column(db.String(500))
@@ -32,8 +45,13 @@ class Skill(db.Model):
     category = db.Column(db.String(50), default='technical')
     order = db.Column(db.Integer, default=0)
     is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Project(db.Model):
+    __table_args__ = (
+        db.Index('ix_project_order_id', 'order', 'id'),
+        db.Index('ix_project_is_active_order_id', 'is_active', 'order', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
@@ -44,15 +62,52 @@ class Project(db.Model):
     order = db.Column(db.Integer, default=0)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    images = db.relationship('ProjectImage', backref='project', cascade='all, delete-orphan')
+    images = db.relationship('ProjectImage', backref='project', cascade='all, delete-orphan',
+                             order_by='ProjectImage.order')
+    # Normalized from `technologies` on every write (see tags.py)
+    tags = db.relationship('Technology', secondary='project_technology', backref='projects',
+                           order_by='Technology.name')
+
+project_technology = db.Table(
+    'project_technology',
+    db.Column('project_id', db.Integer, db.ForeignKey('project.id'), primary_key=True),
+    db.Column('technology_id', db.Integer, db.ForeignKey('technology.id'), primary_key=True),
+    db.Index('ix_project_technology_technology_id_project_id', 'technology_id', 'project_id'),
+)
+
+class Technology(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(100), unique=True, nullable=False)
 
 class ProjectImage(db.Model):
+    __table_args__ = (
+        db.Index('ix_project_image_project_id_order', 'project_id', 'order'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     url = db.Column(db.String(500), nullable=False)
     order = db.Column(db.Integer, default=0)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    variants = db.relationship('ProjectImageVariant', backref='image', cascade='all, delete-orphan',
+                               order_by='ProjectImageVariant.width')
+
+class ProjectImageVariant(db.Model):
+    __table_args__ = (
+        db.Index('ix_project_image_variant_image_id_width', 'image_id', 'width'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    image_id = db.Column(db.Integer, db.ForeignKey('project_image.id'), nullable=False)
+    url = db.Column(db.String(500), nullable=False)
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    mimetype = db.Column(db.String(50), nullable=False)
 
 class Experience(db.Model):
+    __table_args__ = (
+        db.Index('ix_experience_order', 'order'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     company = db.Column(db.String(200), nullable=False)
@@ -65,6 +120,9 @@ class Experience(db.Model):
     is_active = db.Column(db.Boolean, default=True)
 
 class Education(db.Model):
+    __table_args__ = (
+        db.Index('ix_education_order', 'order'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     degree = db.Column(db.String(200), nullable=False)
     institution = db.Column(db.String(200), nullable=False)
@@ -77,6 +135,10 @@ class Education(db.Model):
     is_active = db.Column(db.Boolean, default=True)
 
 class Contact(db.Model):
+    __table_args__ = (
+        db.Index('ix_contact_created_at_id', 'created_at', 'id'),
+        db.Index('ix_contact_read_created_at_id', 'read', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False)
@@ -85,6 +147,9 @@ class Contact(db.Model):
     read = db.Column(db.Boolean, default=False) 
 
 class Certification(db.Model):
+    __table_args__ = (
+        db.Index('ix_certification_order', 'order'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     institution = db.Column(db.String(200), nullable=False)
@@ -95,6 +160,9 @@ class Certification(db.Model):
     certificate_url = db.Column(db.String(500)) 
 
 class Reference(db.Model):
+    __table_args__ = (
+        db.Index('ix_reference_experience_id', 'experience_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     experience_id = db.Column(db.Integer, db.ForeignKey('experience.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -102,4 +170,51 @@ class Reference(db.Model):
     phone = db.Column(db.String(30))
     note = db.Column(db.Text)
 
-Experience.references = db.relationship('Reference', backref='experience', cascade='all, delete-orphan') 
\ No newline at end of file
+Experience.references = db.relationship('Reference', backref='experience', cascade='all, delete-orphan',
+                                        order_by=Reference.id)
+
+class StatBucket(db.Model):
+    # Running totals ('total') and per-month counts ('YYYY-MM') per table, kept by stats.py
+    metric = db.Column(db.String(50), primary_key=True)
+    bucket = db.Column(db.String(7), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class SchemaMarker(db.Model):
+    # Fingerprint of the schema the database was last upgraded to (see schema.py)
+    id = db.Column(db.Integer, primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class Change(db.Model):
+    # Latest change per row, maintained by the triggers in changes.py. Each
+    # write replaces the row's entry with a new, higher seq; deletes leave a
+    # tombstone.
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        db.Index('ix_change_log_resource_row_id', 'resource', 'row_id', unique=True),
+        {'sqlite_autoincrement': True},
+    )
+    seq = db.Column(db.Integer, primary_key=True)
+    resource = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class Job(db.Model):
+    # Durable background work run by jobs.py. run_at is when a queued job is
+    # due, or when a running job's lease expires and another worker may take it.
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    key = db.Column(db.String(200), unique=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
@@ -1,4 +1,5 @@
 from flask import Blueprint
 from .api import api_bp
+from . import batch  # registers the /<resource>/batch routes on api_bp
 
 __all__ = ['api_bp'] 
\ No newline at end of file
@@ -1,30 +1,122 @@
-from flask import Blueprint, request, jsonify, current_app, send_from_directory
-from werkzeug.utils import secure_filename
+from flask import Blueprint, request, jsonify, current_app, g
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
 from werkzeug.security import check_password_hash, generate_password_hash
 from datetime import datetime, timedelta
-import os
+import base64
+import hmac
+import json
 import jwt
-from models import db, User, Project, ProjectImage
+import time
+import uuid
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import selectinload
+from models import db, User, RevokedToken, Project, ProjectImage, ProjectImageVariant, Technology, Profile, Skill, Experience, Reference, Education, Certification, Contact, Job
+from auth import token_cache, AUTH_TAGS
+from database import insert_ignore
+from cache import response_cache
+from contact_queue import contact_queue
+from inbox import contact_inbox
+from metrics import metrics
+from images import queue_image_variants
+import changes
+import jobs
+import search
+import stats
+import tags
+from serializers import PROJECT, PROFILE, CERTIFICATION, SKILL, REFERENCE, EXPERIENCE, EDUCATION, CONTACT
+from storage import save_upload, save_uploads, send_upload, IMAGE_TYPES, DOCUMENT_TYPES
 
 api_bp = Blueprint('api', __name__)
 
+# Loads project images and their responsive variants in two extra queries
+PROJECT_IMAGES = selectinload(Project.images).selectinload(ProjectImage.variants)
+
 # --- Auth Helpers ---
-def generate_token(user_id):
+def generate_token(user):
     SECRET_KEY = current_app.config.get('SECRET_KEY', 'your-secret-key-change-this')
+    now = datetime.utcnow()
     payload = {
-        'user_id': user_id,
-        'exp': datetime.utcnow() + timedelta(hours=12)
+        'user_id': user.id,
+        'jti': uuid.uuid4().hex,
+        'ver': user.token_version or 0,
+        'iat': now,
+        'exp': now + timedelta(hours=12)
     }
     return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
 
 def verify_token(token):
     SECRET_KEY = current_app.config.get('SECRET_KEY', 'your-secret-key-change-this')
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-        return payload['user_id']
+        return jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
     except Exception:
         return None
 
+def check_admin(payload):
+    # Returns an error response unless the payload's user is still an admin
+    # and the login it came from (its jti and token version) is not revoked
+    user = db.session.get(User, payload['user_id'])
+    if not user or not user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    if payload.get('ver', 0) != (user.token_version or 0) or (
+            payload.get('jti') and db.session.get(RevokedToken, payload['jti']) is not None):
+        return jsonify({'error': 'Token has been revoked'}), 401
+    return None
+
+def authenticate_admin(token):
+    # Returns (principal, error response); verified tokens are cached until
+    # their exp or until a user/revocation commit invalidates the cache
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal, None
+    versions = response_cache.versions(AUTH_TAGS)
+    payload = verify_token(token)
+    if not payload or not payload.get('user_id'):
+        return None, (jsonify({'error': 'Invalid or expired token'}), 401)
+    error = check_admin(payload)
+    if error:
+        return None, error
+    return token_cache.put(token, payload['user_id'], payload, versions), None
+
+def generate_stream_ticket(principal):
+    # Short-lived, single-use credential for EventSource connections, which
+    # cannot send headers: it goes in the URL, where the login token must not
+    SECRET_KEY = current_app.config.get('SECRET_KEY', 'your-secret-key-change-this')
+    now = datetime.utcnow()
+    payload = {
+        'typ': 'stream',
+        'user_id': principal.user_id,
+        'jti': uuid.uuid4().hex,
+        'ver': principal.payload.get('ver', 0),
+        # The login it was issued from, re-checked while the stream is open
+        'login_jti': principal.payload.get('jti'),
+        'login_exp': principal.payload['exp'],
+        'iat': now,
+        'exp': now + timedelta(seconds=current_app.config['SSE_TICKET_TTL'])
+    }
+    return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
+
+def redeem_stream_ticket(ticket):
+    # Returns (login payload, error response). A redeemed ticket's jti is
+    # recorded as revoked; the insert is atomic, so a ticket works only once.
+    payload = verify_token(ticket)
+    if not payload or payload.get('typ') != 'stream' or not payload.get('user_id'):
+        return None, (jsonify({'error': 'Invalid or expired ticket'}), 401)
+    redeemed = insert_ignore(db, RevokedToken.__table__, {
+        'jti': payload['jti'], 'user_id': payload['user_id'],
+        'expires_at': datetime.utcfromtimestamp(payload['exp'])}, 'jti')
+    db.session.commit()
+    if not redeemed:
+        return None, (jsonify({'error': 'Ticket has already been used'}), 401)
+    login = {'user_id': payload['user_id'], 'ver': payload.get('ver', 0), 'jti': payload.get('login_jti'),
+             'exp': payload['login_exp']}
+    error = check_admin(login)
+    if error:
+        return None, error
+    return login, None
+
+# Bodies werkzeug parses lazily, on first access to request.form/files
+FORM_MIMETYPES = ('multipart/form-data', 'application/x-www-form-urlencoded')
+
 def admin_required(f):
     from functools import wraps
     @wraps(f)
@@ -33,12 +125,17 @@ def admin_required(f):
         if not auth_header or not auth_header.startswith('Bearer '):
             return jsonify({'error': 'Missing or invalid token'}), 401
         token = auth_header.split(' ')[1]
-        user_id = verify_token(token)
-        if not user_id:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        user = User.query.get(user_id)
-        if not user or not user.is_admin:
-            return jsonify({'error': 'Unauthorized'}), 403
+        principal, error = authenticate_admin(token)
+        if error:
+            return error
+        g.admin = principal
+        if request.mimetype in FORM_MIMETYPES:
+            # A cache miss checked the token on the single writer connection,
+            # whose transactions take the write lock (BEGIN IMMEDIATE). End it
+            # and read the whole body before the view queries, so a slow
+            # upload never holds the lock while it streams in.
+            db.session.rollback()
+            request.files
         return f(*args, **kwargs)
     return decorated
 
@@ -56,6 +153,134 @@ def parse_bool(val):
         return val.lower() == 'true'
     return False
 
+# --- Pagination Helpers ---
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(values):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError('Malformed cursor')
+        return [datetime.fromisoformat(v) if col.type.python_type is datetime else col.type.python_type(v)
+                for v, col in zip(values, columns)]
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def keyset_after(columns, values, descending=False):
+    # (a, b) > (x, y) expanded to a >= x AND (a > x OR (a = x AND b > y)); the
+    # leading bound lets any backend seek the index instead of scanning from the start
+    clauses = []
+    for i, (col, val) in enumerate(zip(columns, values)):
+        cmp = col < val if descending else col > val
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], cmp))
+    first, value = columns[0], values[0]
+    return and_(first <= value if descending else first >= value, or_(*clauses))
+
+def paginate(query, columns, serialize, descending=False):
+    # Returns a plain list unless limit/cursor is given, for older clients
+    order = [c.desc() if descending else c for c in columns]
+    query = query.order_by(*order)
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    if limit is None and not cursor:
+        return [serialize(row) for row in query.all()]
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    if cursor:
+        query = query.filter(keyset_after(columns, decode_cursor(cursor, columns), descending))
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], c.key) for c in columns])
+    return {'items': [serialize(row) for row in rows], 'next_cursor': next_cursor}
+
+# --- Sparse Fieldsets ---
+def requested_fields(serializer):
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    try:
+        serializer.validate(names)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    return names
+
+# --- Error Responses ---
+@api_bp.errorhandler(BadRequest)
+@api_bp.errorhandler(RequestEntityTooLarge)
+@api_bp.errorhandler(UnsupportedMediaType)
+def request_rejected(e):
+    return jsonify({'error': e.description}), e.code
+
+# --- Search ---
+@api_bp.route('/search', methods=['GET'])
+def search_all():
+    # Contacts (and inactive items) are only searched with an admin token
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    if not search.is_available():
+        return jsonify({'error': 'Search is not available on this database'}), 501
+    is_admin = False
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        principal, error = authenticate_admin(auth_header.split(' ')[1])
+        if error:
+            return error
+        is_admin = True
+    if request.args.get('types'):
+        types = [t.strip() for t in request.args['types'].split(',') if t.strip()]
+    else:
+        types = list(search.INDEXES) if is_admin else list(search.PUBLIC_TYPES)
+    unknown = [t for t in types if t not in search.INDEXES]
+    if unknown:
+        raise BadRequest(f"Unknown types: {', '.join(unknown)}")
+    if not is_admin and any(search.INDEXES[t][2] for t in types):
+        return jsonify({'error': 'Missing or invalid token'}), 401
+    limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    recent = request.args.get('sort') == 'recent'
+    results = search.search(query, types, limit, current_app.config['SEARCH_RANK_WINDOW'],
+                            include_inactive=is_admin, recent=recent)
+    return jsonify({'query': query, 'results': results})
+
+# --- Change feed ---
+@api_bp.route('/changes', methods=['GET'])
+def get_changes():
+    # Rows changed after `since`, oldest first; clients pass back next_since.
+    # Not response-cached: contacts depend on the token, which the cache key ignores.
+    if not changes.is_available():
+        return jsonify({'error': 'The change feed is not available on this database'}), 501
+    since = request.args.get('since', 0, type=int)
+    if since < 0:
+        raise BadRequest('since must be a non-negative sequence number')
+    is_admin = False
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        principal, error = authenticate_admin(auth_header.split(' ')[1])
+        if error:
+            return error
+        is_admin = True
+    if request.args.get('types'):
+        types = [t.strip() for t in request.args['types'].split(',') if t.strip()]
+    else:
+        types = list(changes.RESOURCES) if is_admin else list(changes.PUBLIC_RESOURCES)
+    unknown = [t for t in types if t not in changes.RESOURCES]
+    if unknown:
+        raise BadRequest(f"Unknown types: {', '.join(unknown)}")
+    if not is_admin and any(changes.RESOURCES[t][3] for t in types):
+        return jsonify({'error': 'Missing or invalid token'}), 401
+    limit = max(1, min(request.args.get('limit', changes.DEFAULT_LIMIT, type=int), changes.MAX_LIMIT))
+    items, has_more = changes.feed(since, limit, types)
+    # With nothing new, next_since stays put so the client can poll with it
+    next_since = items[-1]['seq'] if items else since
+    return jsonify({'changes': items, 'next_since': next_since, 'has_more': has_more})
+
 # --- Auth Route (login) ---
 @api_bp.route('/admin/login', methods=['POST'])
 def admin_login():
@@ -65,9 +290,40 @@ def admin_login():
     user = User.query.filter_by(username=username, is_admin=True).first()
     if not user or not check_password_hash(user.password_hash, password):
         return jsonify({'error': 'Invalid credentials'}), 401
-    token = generate_token(user.id)
+    token = generate_token(user)
     return jsonify({'token': token})
 
+@api_bp.route('/admin/logout', methods=['POST'])
+@admin_required
+def admin_logout():
+    payload = g.admin.payload
+    now = datetime.utcnow()
+    RevokedToken.query.filter(RevokedToken.expires_at < now).delete()
+    if payload.get('jti'):
+        db.session.add(RevokedToken(jti=payload['jti'], user_id=g.admin.user_id,
+                                    expires_at=datetime.utcfromtimestamp(payload['exp'])))
+    else:
+        # Tokens issued before revocation support can only be dropped all at once
+        user = db.session.get(User, g.admin.user_id)
+        user.token_version = (user.token_version or 0) + 1
+    db.session.commit()
+    return jsonify({'message': 'Logged out'})
+
+@api_bp.route('/admin/password', methods=['PUT'])
+@admin_required
+def change_password():
+    data = request.json
+    user = db.session.get(User, g.admin.user_id)
+    if not check_password_hash(user.password_hash, data.get('current_password') or ''):
+        return jsonify({'error': 'Invalid credentials'}), 401
+    if not data.get('new_password'):
+        return jsonify({'error': 'New password required'}), 400
+    user.password_hash = generate_password_hash(data['new_password'])
+    # Invalidates every token issued so far, including the current one
+    user.token_version = (user.token_version or 0) + 1
+    db.session.commit()
+    return jsonify({'message': 'Password updated', 'token': generate_token(user)})
+
 @api_bp.route('/admin/create', methods=['POST'])
 def create_admin():
     if User.query.filter_by(is_admin=True).first():
@@ -88,38 +344,32 @@ def create_admin():
 
 # --- Project CRUD ---
 @api_bp.route('/projects', methods=['GET'])
+@response_cache.cached(Project, ProjectImage, ProjectImageVariant)
 def get_projects():
-    projects = Project.query.order_by(Project.order).all()
-    return jsonify([{
-        'id': p.id,
-        'title': p.title,
-        'description': p.description,
-        'images': [img.url for img in sorted(p.images, key=lambda x: x.order)],
-        'github_url': p.github_url,
-        'live_url': p.live_url,
-        'technologies': p.technologies,
-        'featured': p.featured,
-        'order': p.order,
-        'is_active': p.is_active,
-        'created_at': p.created_at.isoformat()
-    } for p in projects])
+    query = Project.query.options(PROJECT_IMAGES)
+    if 'is_active' in request.args:
+        query = query.filter(Project.is_active == parse_bool(request.args['is_active']))
+    if 'featured' in request.args:
+        query = query.filter(Project.featured == parse_bool(request.args['featured']))
+    if request.args.get('tech'):
+        # ?tech=react,flask matches projects tagged with all of them
+        query = query.filter(Project.id.in_(tags.projects_with_all(request.args['tech'].split(','))))
+    try:
+        return jsonify(paginate(query, [Project.order, Project.id], PROJECT.for_fields(requested_fields(PROJECT))))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@api_bp.route('/technologies', methods=['GET'])
+@response_cache.cached(Project, Technology)
+def get_technologies():
+    # Tag counts over active projects, from the technology_id index
+    return jsonify(tags.counts())
 
 @api_bp.route('/projects/<int:project_id>', methods=['GET'])
+@response_cache.cached(Project, ProjectImage, ProjectImageVariant)
 def get_project(project_id):
-    p = Project.query.get_or_404(project_id)
-    return jsonify({
-        'id': p.id,
-        'title': p.title,
-        'description': p.description,
-        'images': [img.url for img in sorted(p.images, key=lambda x: x.order)],
-        'github_url': p.github_url,
-        'live_url': p.live_url,
-        'technologies': p.technologies,
-        'featured': p.featured,
-        'order': p.order,
-        'is_active': p.is_active,
-        'created_at': p.created_at.isoformat()
-    })
+    p = Project.query.options(PROJECT_IMAGES).filter_by(id=project_id).first_or_404()
+    return jsonify(PROJECT.one(p, requested_fields(PROJECT)))
 
 @api_bp.route('/projects', methods=['POST'])
 @admin_required
@@ -151,16 +401,10 @@ def create_project():
     )
     db.session.add(project)
     db.session.flush()  # Get project.id before commit
-    upload_folder = current_app.config['UPLOAD_FOLDER']
-    os.makedirs(upload_folder, exist_ok=True)
-    for idx, file in enumerate(files):
-        if file and file.filename:
-            filename = secure_filename(file.filename)
-            timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
-            filename = f"{timestamp}_{idx}_{filename}"
-            file.save(os.path.join(upload_folder, filename))
-            image_url = f"/api/uploads/{filename}"
-            db.session.add(ProjectImage(project_id=project.id, url=image_url, order=idx))
+    urls = save_uploads([file for file in files if file and file.filename], IMAGE_TYPES)
+    images = [ProjectImage(project_id=project.id, url=url, order=idx) for idx, url in enumerate(urls)]
+    db.session.add_all(images)
+    queue_image_variants(images)
     db.session.commit()
     return jsonify({'message': 'Project created', 'id': project.id}), 201
 
@@ -179,21 +423,15 @@ def update_project(project_id):
     project.is_active = data.get('is_active', str(project.is_active)).lower() == 'true'
     # Handle multiple file uploads (replace all images if new ones provided)
     files = request.files.getlist('images')
+    images = []
     if files and len(files) > 0:
         if len(files) > 6:
             return jsonify({'error': 'Maximum 6 images allowed'}), 400
-        # Remove old images
-        ProjectImage.query.filter_by(project_id=project.id).delete()
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        os.makedirs(upload_folder, exist_ok=True)
-        for idx, file in enumerate(files):
-            if file and file.filename:
-                filename = secure_filename(file.filename)
-                timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
-                filename = f"{timestamp}_{idx}_{filename}"
-                file.save(os.path.join(upload_folder, filename))
-                image_url = f"/api/uploads/{filename}"
-                db.session.add(ProjectImage(project_id=project.id, url=image_url, order=idx))
+        urls = save_uploads([file for file in files if file and file.filename], IMAGE_TYPES)
+        images = [ProjectImage(url=url, order=idx) for idx, url in enumerate(urls)]
+        # Replacing the collection deletes the old images and their variants as orphans
+        project.images = images
+    queue_image_variants(images)
     db.session.commit()
     return jsonify({'message': 'Project updated'})
 
@@ -205,35 +443,64 @@ def delete_project(project_id):
     db.session.commit()
     return jsonify({'message': 'Project deleted'})
 
+# --- Portfolio Bundle ---
+def portfolio_profile():
+    profile = Profile.query.first()
+    return PROFILE.dump(profile) if profile else {}
+
+def portfolio_projects():
+    projects = Project.query.options(PROJECT_IMAGES).order_by(Project.order).all()
+    return PROJECT.many(projects)
+
+def portfolio_skills():
+    return SKILL.many(Skill.query.order_by(Skill.order).all())
+
+def portfolio_experience():
+    exp = Experience.query.options(selectinload(Experience.references)).order_by(Experience.order).all()
+    return EXPERIENCE.many(exp)
+
+def portfolio_education():
+    return EDUCATION.many(Education.query.order_by(Education.order).all())
+
+def portfolio_certifications():
+    return CERTIFICATION.many(Certification.query.order_by(Certification.order).all())
+
+PORTFOLIO_SECTIONS = {
+    'profile': portfolio_profile,
+    'projects': portfolio_projects,
+    'skills': portfolio_skills,
+    'experience': portfolio_experience,
+    'education': portfolio_education,
+    'certifications': portfolio_certifications,
+}
+
+@api_bp.route('/portfolio', methods=['GET'])
+@response_cache.cached(Profile, Project, ProjectImage, ProjectImageVariant, Skill, Experience, Reference, Education, Certification)
+def get_portfolio():
+    sections = request.args.get('sections')
+    if sections:
+        names = [name.strip() for name in sections.split(',') if name.strip()]
+        unknown = [name for name in names if name not in PORTFOLIO_SECTIONS]
+        if unknown:
+            return jsonify({'error': f"Unknown sections: {', '.join(unknown)}"}), 400
+    else:
+        names = list(PORTFOLIO_SECTIONS)
+    return jsonify({name: PORTFOLIO_SECTIONS[name]() for name in names})
+
 # --- Serve Uploaded Files ---
-@api_bp.route('/uploads/<filename>', methods=['GET'])
+@api_bp.route('/uploads/<path:filename>', methods=['GET'])
 def uploaded_file(filename):
-    upload_folder = current_app.config['UPLOAD_FOLDER']
-    return send_from_directory(upload_folder, filename)
+    return send_upload(filename)
 
 # --- Profile CV Upload ---
 @api_bp.route('/profile', methods=['GET', 'PUT'])
+@response_cache.cached(Profile)
 def profile():
-    from models import Profile
     if request.method == 'GET':
         profile = Profile.query.first()
         if not profile:
             return jsonify({}), 200
-        return jsonify({
-            'id': profile.id,
-            'name': profile.name,
-            'title': profile.title,
-            'bio': profile.bio,
-            'email': profile.email,
-            'phone': profile.phone,
-            'location': profile.location,
-            'github': profile.github,
-            'linkedin': profile.linkedin,
-            'twitter': profile.twitter,
-            'website': profile.website,
-            'avatar': profile.avatar,
-            'cv_url': profile.cv_url
-        })
+        return jsonify(PROFILE.one(profile, requested_fields(PROFILE)))
     # PUT (update)
     data = request.form
     profile = Profile.query.first()
@@ -255,32 +522,17 @@ def profile():
     if 'cv' in request.files:
         file = request.files['cv']
         if file and file.filename:
-            filename = secure_filename(file.filename)
-            timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-            filename = f"cv_{timestamp}_{filename}"
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            os.makedirs(upload_folder, exist_ok=True)
-            file.save(os.path.join(upload_folder, filename))
-            profile.cv_url = f"/api/uploads/{filename}"
+            profile.cv_url = save_upload(file, DOCUMENT_TYPES)
     db.session.commit()
     return jsonify({'message': 'Profile updated'})
 
 # --- Certification Certificate Upload ---
 @api_bp.route('/certifications', methods=['GET', 'POST'])
+@response_cache.cached(Certification)
 def certifications():
-    from models import Certification
     if request.method == 'GET':
         certs = Certification.query.order_by(Certification.order).all()
-        return jsonify([{
-            'id': c.id,
-            'title': c.title,
-            'institution': c.institution,
-            'description': c.description,
-            'date_awarded': c.date_awarded.isoformat() if c.date_awarded else None,
-            'order': c.order,
-            'is_active': c.is_active,
-            'certificate_url': c.certificate_url
-        } for c in certs])
+        return jsonify(CERTIFICATION.many(certs, requested_fields(CERTIFICATION)))
     # POST
     data = request.form
     cert = Certification(
@@ -295,13 +547,7 @@ def certifications():
     if 'certificate' in request.files:
         file = request.files['certificate']
         if file and file.filename:
-            filename = secure_filename(file.filename)
-            timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-            filename = f"cert_{timestamp}_{filename}"
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            os.makedirs(upload_folder, exist_ok=True)
-            file.save(os.path.join(upload_folder, filename))
-            cert.certificate_url = f"/api/uploads/{filename}"
+            cert.certificate_url = save_upload(file, DOCUMENT_TYPES | IMAGE_TYPES)
     db.session.add(cert)
     db.session.commit()
     return jsonify({'message': 'Certification created', 'id': cert.id}), 201
@@ -309,7 +555,6 @@ def certifications():
 @api_bp.route('/certifications/<int:cert_id>', methods=['PUT'])
 @admin_required
 def update_certification(cert_id):
-    from models import Certification
     cert = Certification.query.get_or_404(cert_id)
     data = request.form
     cert.title = data.get('title', cert.title)
@@ -322,20 +567,13 @@ def update_certification(cert_id):
     if 'certificate' in request.files:
         file = request.files['certificate']
         if file and file.filename:
-            filename = secure_filename(file.filename)
-            timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-            filename = f"cert_{timestamp}_{filename}"
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            os.makedirs(upload_folder, exist_ok=True)
-            file.save(os.path.join(upload_folder, filename))
-            cert.certificate_url = f"/api/uploads/{filename}"
+            cert.certificate_url = save_upload(file, DOCUMENT_TYPES | IMAGE_TYPES)
     db.session.commit()
     return jsonify({'message': 'Certification updated'})
 
 @api_bp.route('/certifications/<int:cert_id>', methods=['DELETE'])
 @admin_required
 def delete_certification(cert_id):
-    from models import Certification
     cert = Certification.query.get_or_404(cert_id)
     db.session.delete(cert)
     db.session.commit()
@@ -344,60 +582,27 @@ def delete_certification(cert_id):
 # Update stats endpoint
 @api_bp.route('/stats', methods=['GET'])
 def get_stats():
-    from models import Project, Skill, Education, Certification, Contact
-    from sqlalchemy import func
-    total_projects = Project.query.count()
-    total_skills = Skill.query.count()
-    total_education = Education.query.count()
-    total_certifications = Certification.query.count()
-    total_contacts = Contact.query.count()
-    project_months = (
-        db.session.query(
-            func.strftime('%Y-%m', Project.created_at).label('month'),
-            func.count(Project.id)
-        )
-        .group_by('month')
-        .order_by('month')
-        .all()
-    )
-    skill_months = (
-        db.session.query(
-            func.strftime('%Y-%m', Skill.id).label('month'),
-            func.count(Skill.id)
-        )
-        .group_by('month')
-        .order_by('month')
-        .all()
-    )
+    totals, months = stats.snapshot()
     return jsonify({
-        'total_projects': total_projects,
-        'total_skills': total_skills,
-        'total_education': total_education,
-        'total_certifications': total_certifications,
-        'total_contacts': total_contacts,
-        'projects_by_month': [ {'month': m, 'count': c} for m, c in project_months ],
-        'skills_by_month': [ {'month': m, 'count': c} for m, c in skill_months ],
+        'total_projects': totals.get('project', 0),
+        'total_skills': totals.get('skill', 0),
+        'total_education': totals.get('education', 0),
+        'total_certifications': totals.get('certification', 0),
+        'total_contacts': totals.get('contact', 0),
+        'projects_by_month': months.get('project', []),
+        'skills_by_month': months.get('skill', []),
     })
 
 # --- Skills CRUD ---
 @api_bp.route('/skills', methods=['GET'])
+@response_cache.cached(Skill)
 def get_skills():
-    from models import Skill
     skills = Skill.query.order_by(Skill.order).all()
-    return jsonify([{
-        'id': s.id,
-        'name': s.name,
-        'icon': s.icon,
-        'proficiency': s.proficiency,
-        'category': s.category,
-        'order': s.order,
-        'is_active': s.is_active
-    } for s in skills])
+    return jsonify(SKILL.many(skills, requested_fields(SKILL)))
 
 @api_bp.route('/skills', methods=['POST'])
 @admin_required
 def create_skill():
-    from models import Skill
     data = request.json
     skill = Skill(
         name=data.get('name'),
@@ -414,7 +619,6 @@ def create_skill():
 @api_bp.route('/skills/<int:skill_id>', methods=['PUT'])
 @admin_required
 def update_skill(skill_id):
-    from models import Skill
     skill = Skill.query.get_or_404(skill_id)
     data = request.json
     skill.name = data.get('name', skill.name)
@@ -429,7 +633,6 @@ def update_skill(skill_id):
 @api_bp.route('/skills/<int:skill_id>', methods=['DELETE'])
 @admin_required
 def delete_skill(skill_id):
-    from models import Skill
     skill = Skill.query.get_or_404(skill_id)
     db.session.delete(skill)
     db.session.commit()
@@ -437,51 +640,20 @@ def delete_skill(skill_id):
 
 # --- Experience CRUD ---
 @api_bp.route('/experience', methods=['GET'])
+@response_cache.cached(Experience, Reference)
 def get_experience():
-    from models import Experience, Reference
-    exp = Experience.query.order_by(Experience.order).all()
-    return jsonify([
-        {
-            'id': e.id,
-            'title': e.title,
-            'company': e.company,
-            'description': e.description,
-            'start_date': e.start_date.isoformat() if e.start_date else None,
-            'end_date': e.end_date.isoformat() if e.end_date else None,
-            'current': e.current,
-            'location': e.location,
-            'order': e.order,
-            'is_active': e.is_active,
-            'references': [
-                {
-                    'id': r.id,
-                    'name': r.name,
-                    'email': r.email,
-                    'phone': r.phone,
-                    'note': r.note
-                } for r in e.references
-            ]
-        } for e in exp
-    ])
+    exp = Experience.query.options(selectinload(Experience.references)).order_by(Experience.order).all()
+    return jsonify(EXPERIENCE.many(exp, requested_fields(EXPERIENCE)))
 
 @api_bp.route('/experience/<int:exp_id>/references', methods=['GET'])
+@response_cache.cached(Reference)
 def get_references(exp_id):
-    from models import Reference
-    refs = Reference.query.filter_by(experience_id=exp_id).all()
-    return jsonify([
-        {
-            'id': r.id,
-            'name': r.name,
-            'email': r.email,
-            'phone': r.phone,
-            'note': r.note
-        } for r in refs
-    ])
+    refs = Reference.query.filter_by(experience_id=exp_id).order_by(Reference.id).all()
+    return jsonify(REFERENCE.many(refs, requested_fields(REFERENCE)))
 
 @api_bp.route('/experience/<int:exp_id>/references', methods=['POST'])
 @admin_required
 def create_reference(exp_id):
-    from models import Reference, db
     data = request.json
     name = data.get('name')
     email = data.get('email')
@@ -497,7 +669,6 @@ def create_reference(exp_id):
 @api_bp.route('/references/<int:ref_id>', methods=['PUT'])
 @admin_required
 def update_reference(ref_id):
-    from models import Reference, db
     ref = Reference.query.get_or_404(ref_id)
     data = request.json
     ref.name = data.get('name', ref.name)
@@ -510,7 +681,6 @@ def update_reference(ref_id):
 @api_bp.route('/references/<int:ref_id>', methods=['DELETE'])
 @admin_required
 def delete_reference(ref_id):
-    from models import Reference, db
     ref = Reference.query.get_or_404(ref_id)
     db.session.delete(ref)
     db.session.commit()
@@ -518,26 +688,14 @@ def delete_reference(ref_id):
 
 # --- Education CRUD ---
 @api_bp.route('/education', methods=['GET'])
+@response_cache.cached(Education)
 def get_education():
-    from models import Education
     edu = Education.query.order_by(Education.order).all()
-    return jsonify([{
-        'id': e.id,
-        'degree': e.degree,
-        'institution': e.institution,
-        'description': e.description,
-        'start_date': e.start_date.isoformat() if e.start_date else None,
-        'end_date': e.end_date.isoformat() if e.end_date else None,
-        'current': e.current,
-        'gpa': e.gpa,
-        'order': e.order,
-        'is_active': e.is_active
-    } for e in edu])
+    return jsonify(EDUCATION.many(edu, requested_fields(EDUCATION)))
 
 @api_bp.route('/education', methods=['POST'])
 @admin_required
 def create_education():
-    from models import Education
     data = request.json
     edu = Education(
         degree=data.get('degree'),
@@ -557,7 +715,6 @@ def create_education():
 @api_bp.route('/education/<int:edu_id>', methods=['PUT'])
 @admin_required
 def update_education(edu_id):
-    from models import Education
     edu = Education.query.get_or_404(edu_id)
     data = request.json
     edu.degree = data.get('degree', edu.degree)
@@ -575,7 +732,6 @@ def update_education(edu_id):
 @api_bp.route('/education/<int:edu_id>', methods=['DELETE'])
 @admin_required
 def delete_education(edu_id):
-    from models import Education
     edu = Education.query.get_or_404(edu_id)
     db.session.delete(edu)
     db.session.commit()
@@ -584,35 +740,119 @@ def delete_education(edu_id):
 # --- Contacts ---
 @api_bp.route('/contacts', methods=['GET'])
 def get_contacts():
-    from models import Contact
-    contacts = Contact.query.order_by(Contact.created_at.desc()).all()
-    return jsonify([{
-        'id': c.id,
-        'name': c.name,
-        'email': c.email,
-        'message': c.message,
-        'created_at': c.created_at.isoformat() if c.created_at else None,
-        'read': c.read
-    } for c in contacts])
+    query = Contact.query
+    if 'read' in request.args:
+        query = query.filter(Contact.read == parse_bool(request.args['read']))
+    try:
+        return jsonify(paginate(query, [Contact.created_at, Contact.id], CONTACT.for_fields(requested_fields(CONTACT)),
+                                descending=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
 @api_bp.route('/contacts', methods=['POST'])
 def create_contact():
-    from models import Contact, db
     data = request.json
     name = data.get('name')
     email = data.get('email')
     message = data.get('message')
     if not name or not email or not message:
         return jsonify({'error': 'All fields are required.'}), 400
+    if contact_queue.enabled:
+        if not contact_queue.enqueue(name, email, message):
+            response = jsonify({'error': 'Too many messages right now, please try again shortly.'})
+            response.headers['Retry-After'] = str(max(1, round(contact_queue.interval)))
+            return response, 503
+        return jsonify({'message': 'Contact message received.'}), 202
     contact = Contact(name=name, email=email, message=message)
     db.session.add(contact)
     db.session.commit()
     return jsonify({'message': 'Contact message received.'}), 201
 
+@api_bp.route('/contacts/events/ticket', methods=['POST'])
+@admin_required
+def contact_events_ticket():
+    ttl = current_app.config['SSE_TICKET_TTL']
+    return jsonify({'ticket': generate_stream_ticket(g.admin), 'expires_in': ttl}), 201
+
+@api_bp.route('/contacts/events', methods=['GET'])
+def contact_events():
+    # Server-Sent Events for the admin inbox. EventSource cannot send headers,
+    # so browsers pass a ticket from POST /contacts/events/ticket as ?ticket=.
+    # Tickets are single-use: clients get a new one for every connection and
+    # resume with ?last_event_id= (other clients may send the Bearer token and
+    # Last-Event-ID headers instead).
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        principal, error = authenticate_admin(auth_header[7:])
+        login = principal.payload if principal else None
+    elif request.args.get('ticket'):
+        login, error = redeem_stream_ticket(request.args['ticket'])
+    else:
+        return jsonify({'error': 'Missing or invalid token'}), 401
+    if error:
+        return error
+    if not changes.is_available():
+        return jsonify({'error': 'The contact stream is not available on this database'}), 501
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise BadRequest('Last-Event-ID must be a change sequence number')
+    else:
+        since = changes.latest_seq()
+    # Closes the stream once the login is revoked, its user demoted or its token expired
+    def check():
+        return login['exp'] > time.time() and check_admin(login) is None
+    response = contact_inbox.response(since, resumed=bool(last_event_id), check=check)
+    if response is None:
+        response = jsonify({'error': 'Too many open streams, please try again shortly.'})
+        response.headers['Retry-After'] = str(round(contact_inbox.retry_ms / 1000))
+        return response, 503
+    return response
+
+@api_bp.route('/contacts/queue', methods=['GET'])
+@admin_required
+def contact_queue_metrics():
+    return jsonify(contact_queue.metrics())
+
+@api_bp.route('/jobs', methods=['GET'])
+@admin_required
+def job_queue():
+    failures = max(0, min(request.args.get('failures', 20, type=int), MAX_PAGE_SIZE))
+    return jsonify(jobs.queue_stats(failures))
+
+@api_bp.route('/jobs/<int:job_id>/retry', methods=['POST'])
+@admin_required
+def retry_job(job_id):
+    job = Job.query.get_or_404(job_id)
+    if job.status != jobs.FAILED:
+        return jsonify({'error': f"Only failed jobs can be retried; this one is {job.status}"}), 409
+    jobs.retry(job)
+    return jsonify({'message': 'Job queued'})
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Scrapers may use the static METRICS_TOKEN instead of a short-lived admin token
+    auth_header = request.headers.get('Authorization', '')
+    scrape_token = current_app.config.get('METRICS_TOKEN')
+    if not (scrape_token and auth_header.startswith('Bearer ')
+            and hmac.compare_digest(auth_header[7:].encode(), scrape_token.encode())):
+        if not auth_header.startswith('Bearer '):
+            return jsonify({'error': 'Missing or invalid token'}), 401
+        _, error = authenticate_admin(auth_header.split(' ')[1])
+        if error:
+            return error
+    if not metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    response = current_app.response_class(metrics.render(), mimetype='text/plain')
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 @api_bp.route('/contacts/<int:contact_id>', methods=['PUT'])
 @admin_required
 def mark_contact_read(contact_id):
-    from models import Contact
     contact = Contact.query.get_or_404(contact_id)
     contact.read = True
     db.session.commit()
@@ -621,7 +861,6 @@ def mark_contact_read(contact_id):
 @api_bp.route('/contacts/<int:contact_id>', methods=['DELETE'])
 @admin_required
 def delete_contact(contact_id):
-    from models import Contact
     contact = Contact.query.get_or_404(contact_id)
     db.session.delete(contact)
     db.session.commit()
@@ -630,7 +869,6 @@ def delete_contact(contact_id):
 @api_bp.route('/experience', methods=['POST'])
 @admin_required
 def create_experience():
-    from models import Experience, db
     data = request.json
     exp = Experience(
         title=data.get('title'),
@@ -0,0 +1,207 @@
+from flask import request, jsonify
+from sqlalchemy import update
+
+from models import db, Skill, Project, Experience, Education
+import tags
+from .api import api_bp, admin_required, parse_date, parse_bool
+
+MAX_BATCH_SIZE = 500
+OPS = ('create', 'update', 'delete', 'order')
+
+
+class BatchError(Exception):
+    pass
+
+
+# --- Field parsers ---
+def text(value):
+    if value is None:
+        return None
+    if not isinstance(value, (str, int, float)):
+        raise BatchError('must be a string')
+    return str(value)
+
+
+def integer(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise BatchError('must be an integer')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise BatchError('must be an integer')
+
+
+def number(value):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise BatchError('must be a number')
+
+
+def date(value):
+    try:
+        return parse_date(value)
+    except (TypeError, ValueError):
+        raise BatchError('must be a date (YYYY-MM-DD)')
+
+
+# (model, {field: parser}, fields required on create, creatable)
+RESOURCES = {
+    'skills': (Skill, {
+        'name': text, 'icon': text, 'proficiency': integer, 'category': text,
+        'order': integer, 'is_active': parse_bool,
+    }, ('name', 'proficiency'), True),
+    # New projects need image uploads, so they are created with POST /projects
+    'projects': (Project, {
+        'title': text, 'description': text, 'github_url': text, 'live_url': text,
+        'technologies': text, 'featured': parse_bool, 'order': integer, 'is_active': parse_bool,
+    }, ('title', 'description'), False),
+    'experience': (Experience, {
+        'title': text, 'company': text, 'description': text, 'start_date': date,
+        'end_date': date, 'current': parse_bool, 'location': text, 'order': integer,
+        'is_active': parse_bool,
+    }, ('title', 'company', 'description', 'start_date'), True),
+    'education': (Education, {
+        'degree': text, 'institution': text, 'description': text, 'start_date': date,
+        'end_date': date, 'current': parse_bool, 'gpa': number, 'order': integer,
+        'is_active': parse_bool,
+    }, ('degree', 'institution', 'start_date'), True),
+}
+
+
+# --- Validation ---
+def parse_values(data, fields, required):
+    if not isinstance(data, dict):
+        raise BatchError('data must be an object')
+    unknown = sorted(set(data) - set(fields))
+    if unknown:
+        raise BatchError(f"unknown fields: {', '.join(unknown)}")
+    values = {}
+    for name, value in data.items():
+        try:
+            values[name] = fields[name](value)
+        except BatchError as e:
+            raise BatchError(f"{name} {e}")
+    missing = [name for name in required if values.get(name) in (None, '')]
+    if missing:
+        raise BatchError(f"missing required fields: {', '.join(missing)}")
+    return values
+
+
+def parse_operation(op, fields, required, creatable):
+    if not isinstance(op, dict) or op.get('op') not in OPS:
+        raise BatchError(f"op must be one of: {', '.join(OPS)}")
+    kind = op['op']
+    if kind == 'create':
+        if not creatable:
+            raise BatchError('create is not supported for this resource')
+        return kind, None, parse_values(op.get('data', {}), fields, required)
+    item_id = op.get('id')
+    if not isinstance(item_id, int) or isinstance(item_id, bool):
+        raise BatchError('id must be an integer')
+    if kind == 'update':
+        values = parse_values(op.get('data', {}), fields, ())
+        for name in required:
+            if name in values and values[name] in (None, ''):
+                raise BatchError(f"{name} cannot be empty")
+        return kind, item_id, values
+    if kind == 'order':
+        return kind, item_id, {'order': parse_values({'order': op.get('order')}, fields, ('order',))['order']}
+    return kind, item_id, None
+
+
+def validate(ops, model, fields, required, creatable):
+    # Every operation is checked, and every id looked up, before anything is written
+    errors = []
+    parsed = []
+    for index, op in enumerate(ops):
+        try:
+            parsed.append(parse_operation(op, fields, required, creatable))
+        except BatchError as e:
+            errors.append({'index': index, 'error': str(e)})
+            parsed.append(None)
+    ids = {p[1] for p in parsed if p and p[1] is not None}
+    existing = {row[0] for row in db.session.query(model.id).filter(model.id.in_(ids))} if ids else set()
+    deleted = set()
+    for index, p in enumerate(parsed):
+        if p is None or p[1] is None:
+            continue
+        kind, item_id, _ = p
+        if item_id not in existing:
+            errors.append({'index': index, 'error': f"id {item_id} not found"})
+        elif item_id in deleted:
+            errors.append({'index': index, 'error': f"id {item_id} is deleted earlier in the batch"})
+        elif kind == 'delete':
+            deleted.add(item_id)
+    return parsed, sorted(errors, key=lambda e: e['index'])
+
+
+# --- Apply ---
+def apply(model, parsed):
+    # Creates go through the unit of work as one batched INSERT, updates and
+    # order changes as executemany UPDATEs by primary key, and deletes load
+    # their rows with one IN query so ORM cascades and counters still apply
+    created = []
+    changes = {}
+    for kind, item_id, values in parsed:
+        if kind == 'create':
+            obj = model(**values)
+            db.session.add(obj)
+            created.append(obj)
+        elif kind in ('update', 'order'):
+            changes.setdefault(item_id, {}).update(values)
+    deletes = [item_id for kind, item_id, _ in parsed if kind == 'delete']
+
+    # executemany needs the same columns in every row, so group by column set
+    groups = {}
+    for item_id, values in changes.items():
+        groups.setdefault(frozenset(values), []).append({'id': item_id, **values})
+    for group in groups.values():
+        db.session.execute(update(model), group)
+    # Bulk UPDATEs skip the ORM flush hooks, so re-derive tags here
+    retagged = [item_id for item_id, values in changes.items() if 'technologies' in values]
+    if model is Project and retagged:
+        tags.sync(db.session, Project.query.filter(Project.id.in_(retagged)))
+    if deletes:
+        for obj in model.query.filter(model.id.in_(deletes)):
+            db.session.delete(obj)
+    db.session.flush()
+
+    results = []
+    created_iter = iter(created)
+    for index, (kind, item_id, _) in enumerate(parsed):
+        if kind == 'create':
+            item_id = next(created_iter).id
+        results.append({'index': index, 'op': kind, 'id': item_id, 'status': 'ok'})
+    return results
+
+
+def batch_endpoint(resource):
+    model, fields, required, creatable = RESOURCES[resource]
+
+    @admin_required
+    def endpoint():
+        ops = request.get_json(silent=True)
+        if isinstance(ops, dict):
+            ops = ops.get('operations')
+        if not isinstance(ops, list) or not ops:
+            return jsonify({'error': 'Expected a non-empty array of operations'}), 400
+        if len(ops) > MAX_BATCH_SIZE:
+            return jsonify({'error': f"At most {MAX_BATCH_SIZE} operations per batch"}), 400
+        parsed, errors = validate(ops, model, fields, required, creatable)
+        if errors:
+            return jsonify({'error': 'Batch rejected; nothing was applied', 'errors': errors}), 400
+        results = apply(model, parsed)
+        db.session.commit()
+        return jsonify({'results': results})
+
+    endpoint.__name__ = f"batch_{resource}"
+    return endpoint
+
+
+for _resource in RESOURCES:
+    api_bp.add_url_rule(f"/{_resource}/batch", view_func=batch_endpoint(_resource), methods=['POST'])
@@ -0,0 +1,214 @@
+import hashlib
+import os
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import inspect, select
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from models import (db, User, Project, ProjectImage, Skill, Experience, Reference, Education, Contact, Certification,
+                    SchemaMarker, Job)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Bump when a release needs the startup upgrade to run again without a DDL
+# change (backfills, new derived data); DDL changes are picked up by themselves
+SCHEMA_REVISION = 1
+
+
+# --- In-place upgrades ---
+def ensure_columns():
+    # Nullable columns added to existing models are appended with ALTER TABLE
+    inspector = inspect(db.engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col['name'] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} in place")
+            preparer = db.engine.dialect.identifier_preparer
+            ddl = (f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN "
+                   f"{preparer.format_column(column)} {column.type.compile(db.engine.dialect)}")
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql(ddl)
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def ensure_indexes():
+    # create_all() skips tables that already exist, so indexes added to the
+    # models later are created here without touching existing rows.
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine, checkfirst=True)
+                created.append(index.name)
+    return created
+
+
+def upgrade_schema():
+    db.create_all()
+    return ensure_columns(), ensure_indexes()
+
+
+# --- Startup ---
+def schema_fingerprint():
+    # Hash of the DDL the models, search indexes and change log triggers expect
+    import changes
+    import search
+    dialect = db.engine.dialect
+    parts = [f"revision {SCHEMA_REVISION}"]
+    for table in db.metadata.sorted_tables:
+        parts.append(str(CreateTable(table).compile(dialect=dialect)))
+        parts.extend(sorted(str(CreateIndex(index).compile(dialect=dialect)) for index in table.indexes))
+    for name in search.INDEXES:
+        parts.extend(search.index_ddl(name).values())
+    parts.extend(changes.trigger_ddl().values())
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+
+def read_marker():
+    if not inspect(db.engine).has_table(SchemaMarker.__tablename__):
+        return None
+    fingerprint = db.session.execute(select(SchemaMarker.fingerprint).where(SchemaMarker.id == 1)).scalar()
+    db.session.commit()
+    return fingerprint
+
+
+def write_marker(fingerprint):
+    marker = db.session.get(SchemaMarker, 1) or SchemaMarker(id=1)
+    marker.fingerprint = fingerprint
+    marker.applied_at = datetime.utcnow()
+    db.session.add(marker)
+    db.session.commit()
+
+
+@contextmanager
+def startup_lock():
+    # Serializes the upgrade across worker processes on this host
+    os.makedirs(current_app.instance_path, exist_ok=True)
+    with open(os.path.join(current_app.instance_path, 'schema.lock'), 'w') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def run_upgrades():
+    import changes
+    import search
+    import stats
+    import tags
+    added = upgrade_schema()
+    stats.ensure_counters()
+    tags.ensure_tags()
+    search.ensure_search_index()
+    changes.ensure_change_log()
+    return added
+
+
+def detect_features():
+    import changes
+    import search
+    search.detect_search_index()
+    changes.detect_change_log()
+
+
+def prepare_database(mode='auto'):
+    # Brings the database up to date at boot. 'auto' runs the upgrade steps
+    # only when the stored marker differs from the current fingerprint, so
+    # once one worker has upgraded, the others do a single lookup; 'always'
+    # runs them regardless and 'skip' trusts that a release step already did.
+    # Returns 'current', 'upgraded' or 'skipped'.
+    if mode == 'skip':
+        detect_features()
+        return 'skipped'
+    fingerprint = schema_fingerprint()
+    if mode == 'auto' and read_marker() == fingerprint:
+        detect_features()
+        return 'current'
+    with startup_lock():
+        # Another worker may have finished while this one waited
+        if mode == 'auto' and read_marker() == fingerprint:
+            detect_features()
+            return 'current'
+        run_upgrades()
+        write_marker(fingerprint)
+    return 'upgraded'
+
+
+# --- Query plan checks ---
+def hot_queries():
+    from routes.api import keyset_after
+    import tags
+    # (name, statement, allow_temp_sort)
+    return [
+        ('admin_login', select(User).where(User.username == 'admin', User.is_admin == True), False),
+        ('get_projects', select(Project).order_by(Project.order, Project.id), False),
+        ('get_projects?is_active', select(Project).where(Project.is_active == True)
+            .order_by(Project.order, Project.id), False),
+        ('get_projects?cursor', select(Project).where(keyset_after([Project.order, Project.id], [0, 1]))
+            .order_by(Project.order, Project.id), False),
+        ('get_projects?tech', select(Project).where(Project.id.in_(tags.projects_with_all(['react', 'flask'])))
+            .order_by(Project.order, Project.id), True),
+        # Ordered by count, so the grouped rows are always sorted afterwards
+        ('get_technologies', tags.counts_statement(), True),
+        # selectinload batches parents with IN (...), so the handful of child rows
+        # are sorted after the index lookups
+        ('project images', select(ProjectImage).where(ProjectImage.project_id.in_([1, 2]))
+            .order_by(ProjectImage.order), True),
+        ('get_skills', select(Skill).order_by(Skill.order), False),
+        ('get_experience', select(Experience).order_by(Experience.order), False),
+        ('experience references', select(Reference).where(Reference.experience_id.in_([1, 2]))
+            .order_by(Reference.id), True),
+        ('get_references', select(Reference).where(Reference.experience_id == 1).order_by(Reference.id), False),
+        ('get_education', select(Education).order_by(Education.order), False),
+        ('certifications', select(Certification).order_by(Certification.order), False),
+        ('get_contacts', select(Contact).order_by(Contact.created_at.desc(), Contact.id.desc()), False),
+        ('get_contacts?read', select(Contact).where(Contact.read == False)
+            .order_by(Contact.created_at.desc(), Contact.id.desc()), False),
+        ('get_contacts?cursor', select(Contact).where(
+            keyset_after([Contact.created_at, Contact.id], [datetime(2024, 1, 1), 10], descending=True))
+            .order_by(Contact.created_at.desc(), Contact.id.desc()), False),
+        # Queued and expired running jobs are two index ranges merged by run_at
+        ('claim_job', select(Job.id).where(Job.status.in_(('queued', 'running')), Job.run_at <= datetime(2024, 1, 1))
+            .order_by(Job.run_at, Job.id).limit(1), True),
+    ]
+
+
+def explain(statement):
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def check_query_plans():
+    results = []
+    for name, statement, allow_temp_sort in hot_queries():
+        plan = explain(statement)
+        problems = []
+        for detail in plan:
+            if detail.startswith('SCAN ') and 'INDEX' not in detail:
+                problems.append('full table scan')
+            if 'TEMP B-TREE' in detail and not allow_temp_sort:
+                problems.append('temp b-tree sort')
+        results.append((name, plan, problems))
+    return results
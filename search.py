@@ -0,0 +1,183 @@
+import html
+import logging
+import re
+
+from sqlalchemy import text
+
+from models import db, Project, Experience, Education, Certification, Contact
+
+logger = logging.getLogger(__name__)
+
+# FTS5 tables over the searchable text columns. Each is an external-content
+# index (the text lives only in the source table) kept in sync by triggers, so
+# every writer, including bulk UPDATEs, updates it in the same transaction.
+# The first column is the result title and is weighted highest.
+# name: (model, columns, admin_only)
+INDEXES = {
+    'project': (Project, ('title', 'description', 'technologies'), False),
+    'experience': (Experience, ('title', 'company', 'description', 'location'), False),
+    'education': (Education, ('degree', 'institution', 'description'), False),
+    'certification': (Certification, ('title', 'institution', 'description'), False),
+    'contact': (Contact, ('name', 'email', 'message'), True),
+}
+PUBLIC_TYPES = tuple(name for name, (_, _, admin_only) in INDEXES.items() if not admin_only)
+TITLE_WEIGHT = 10.0
+MAX_TERMS = 8
+# Prefix lengths with their own index; longer prefixes would merge every
+# matching term's full doclist, so long terms match whole words only unless
+# the query asks for a prefix with a trailing *
+PREFIX_LENGTHS = (2, 3, 4, 5, 6)
+SNIPPET_TOKENS = 16
+# Control characters never appear in stored text, so the markers survive escaping
+MARK_OPEN, MARK_CLOSE = '\x02', '\x03'
+
+_available = None
+
+
+def fts_table(name):
+    return f"{name}_fts"
+
+
+def is_available():
+    return bool(_available)
+
+
+# --- Schema ---
+def index_ddl(name):
+    # {schema object name: CREATE statement}
+    model, columns, _ = INDEXES[name]
+    table, fts = model.__tablename__, fts_table(name)
+    cols = ', '.join(columns)
+    new = ', '.join(f"new.{c}" for c in columns)
+    old = ', '.join(f"old.{c}" for c in columns)
+    prefix = ' '.join(map(str, PREFIX_LENGTHS))
+    return {
+        fts: f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='id', "
+             f"tokenize='unicode61 remove_diacritics 2', prefix='{prefix}')",
+        f"{fts}_ai": f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+                     f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"{fts}_ad": f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+                     f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"{fts}_au": f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+                     f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+                     f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+    }
+
+
+def ensure_search_index():
+    # Creates missing FTS tables and triggers (recreating any whose definition
+    # changed) and fills them from the existing rows; returns the names of the
+    # indexes that were built
+    global _available
+    if db.engine.dialect.name != 'sqlite':
+        _available = False
+        return []
+    # Runs on the session's connection: the writer pool holds a single connection
+    conn = db.session.connection()
+    existing = dict(conn.exec_driver_sql("SELECT name, sql FROM sqlite_master").fetchall())
+    created = []
+    for name in INDEXES:
+        fts, ddls = fts_table(name), index_ddl(name)
+        if all(existing.get(obj) == ddl for obj, ddl in ddls.items()):
+            continue
+        try:
+            for obj in ddls:
+                kind = 'TABLE' if obj == fts else 'TRIGGER'
+                conn.exec_driver_sql(f"DROP {kind} IF EXISTS {obj}")
+            for ddl in ddls.values():
+                conn.exec_driver_sql(ddl)
+        except Exception as e:
+            db.session.rollback()
+            if 'fts5' not in str(e):
+                raise
+            logger.warning('SQLite was built without FTS5; search is disabled')
+            _available = False
+            return []
+        conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        created.append(name)
+    db.session.commit()
+    _available = True
+    return created
+
+
+def detect_search_index():
+    # For workers that skip ensure_search_index(): the indexes exist if the
+    # upgrade managed to create them
+    global _available
+    if db.engine.dialect.name != 'sqlite':
+        _available = False
+        return False
+    conn = db.session.connection()
+    tables = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    db.session.commit()
+    _available = all(fts_table(name) in tables for name in INDEXES)
+    return _available
+
+
+def rebuild(optimize=True):
+    conn = db.session.connection()
+    for name in INDEXES:
+        fts = fts_table(name)
+        conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        if optimize:
+            conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+    db.session.commit()
+
+
+# --- Queries ---
+def build_match(query):
+    # User input becomes quoted terms ANDed together; the last term (and any
+    # term ending in *) matches as a prefix for search-as-you-type
+    terms = re.findall(r"\w+\*?", query)[:MAX_TERMS]
+    parts = []
+    for i, term in enumerate(terms):
+        word = term.rstrip('*')
+        prefix = term.endswith('*') or (i == len(terms) - 1 and len(word) <= PREFIX_LENGTHS[-1])
+        parts.append(f'"{word}"*' if prefix else f'"{word}"')
+    return ' '.join(parts)
+
+
+def highlighted(value):
+    if value is None:
+        return None
+    return html.escape(value).replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>')
+
+
+def search_index(name, match, limit, window, include_inactive=False, recent=False):
+    model, columns, _ = INDEXES[name]
+    table, fts = model.__tablename__, fts_table(name)
+    weights = ', '.join([str(TITLE_WEIGHT)] + ['1.0'] * (len(columns) - 1))
+    where = '' if include_inactive or 'is_active' not in model.__table__.c else 'AND t.is_active = 1'
+    if recent:
+        # FTS5 walks the doclists newest first and stops at the limit
+        bound, order = '', 'f.rowid DESC'
+    else:
+        # bm25 has to score every candidate, so only the newest `window`
+        # matches are ranked; the rowid bound is applied inside FTS5
+        bound = (f"AND f.rowid >= coalesce((SELECT rowid FROM {fts} WHERE {fts} MATCH :match "
+                 f"ORDER BY rowid DESC LIMIT 1 OFFSET :window - 1), 0)")
+        order = 'score'
+    sql = text(
+        f"SELECT f.rowid AS id, bm25({fts}, {weights}) AS score, "
+        f"highlight({fts}, 0, :open, :close) AS title, "
+        f"snippet({fts}, -1, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet "
+        f"FROM {fts} f JOIN {table} t ON t.id = f.rowid "
+        f"WHERE {fts} MATCH :match {bound} {where} ORDER BY {order} LIMIT :limit"
+    )
+    rows = db.session.execute(sql, {'match': match, 'limit': limit, 'window': window,
+                                    'open': MARK_OPEN, 'close': MARK_CLOSE})
+    return [{'type': name, 'id': row.id, 'score': round(-row.score, 6),
+             'title': highlighted(row.title), 'snippet': highlighted(row.snippet)}
+            for row in rows]
+
+
+def search(query, types, limit, window=1000, include_inactive=False, recent=False):
+    match = build_match(query)
+    if not match:
+        return []
+    results = []
+    for name in types:
+        results.extend(search_index(name, match, limit, window, include_inactive, recent))
+    if len(types) > 1 and not recent:
+        results.sort(key=lambda r: r['score'], reverse=True)
+    return results[:limit]
@@ -0,0 +1,263 @@
+import json
+import threading
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# --- Field specs ---
+# Each spec is a Python expression over `obj`, plus any helpers it needs.
+class Field:
+    __slots__ = ('source', 'namespace')
+
+    def __init__(self, source, namespace=None):
+        self.source = source
+        self.namespace = namespace or {}
+
+
+def attr(name):
+    return Field(f"obj.{name}")
+
+
+def iso(name):
+    return Field(f"_iso(obj.{name})", {'_iso': _iso})
+
+
+def nested(name, serializer):
+    helper = f"_{serializer.name}"
+    return Field(f"[{helper}(v) for v in obj.{name}]", {helper: serializer.dump})
+
+
+def expr(source, **namespace):
+    return Field(source, namespace)
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def parse_list(value):
+    # Project.technologies is stored as a JSON array string; tolerate comma lists
+    if not value:
+        return []
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return [item.strip() for item in value.split(',') if item.strip()]
+    if isinstance(parsed, list):
+        return parsed
+    return [parsed] if parsed else []
+
+
+# --- Serializer ---
+MAX_COMPILED = 64
+
+
+class Serializer:
+    # Compiles its field specs into one straight-line function per requested
+    # field set, so dumping a row is a single dict literal with no per-field
+    # dispatch.
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = dict(fields)
+        self._compiled = {}
+        self._lock = threading.Lock()
+        self.dump = self.compile(None)
+
+    def compile(self, names):
+        key = None if names is None else frozenset(names)
+        fn = self._compiled.get(key)
+        if fn is not None:
+            return fn
+        selected = [n for n in self.fields if key is None or n in key]
+        namespace = {}
+        items = []
+        for n in selected:
+            field = self.fields[n]
+            namespace.update(field.namespace)
+            items.append(f"{n!r}: {field.source}")
+        source = f"def serialize(obj):\n    return {{{', '.join(items)}}}\n"
+        exec(compile(source, f"<serializer {self.name}>", 'exec'), namespace)
+        fn = namespace['serialize']
+        with self._lock:
+            if len(self._compiled) < MAX_COMPILED:
+                self._compiled[key] = fn
+        return fn
+
+    def validate(self, names):
+        unknown = sorted(set(names) - set(self.fields))
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    def for_fields(self, names=None):
+        if names is None:
+            return self.dump
+        self.validate(names)
+        return self.compile(names)
+
+    def one(self, obj, names=None):
+        return self.for_fields(names)(obj)
+
+    def many(self, rows, names=None):
+        fn = self.for_fields(names)
+        return [fn(row) for row in rows]
+
+
+# --- Pluggable JSON encoding ---
+class OrjsonProvider(DefaultJSONProvider):
+    # Same output as the default provider (sorted keys, compact), via orjson
+    option = 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs or orjson is None:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs or orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option),
+            mimetype=self.mimetype,
+        )
+
+
+if orjson is not None:
+    OrjsonProvider.option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+JSON_PROVIDERS = {
+    'json': DefaultJSONProvider,
+    'orjson': OrjsonProvider,
+}
+
+
+def init_app(app):
+    name = app.config.get('JSON_PROVIDER', 'json')
+    provider = JSON_PROVIDERS.get(name)
+    if provider is None:
+        raise RuntimeError(f"Unknown JSON_PROVIDER {name!r}; choose from {', '.join(JSON_PROVIDERS)}")
+    app.json = provider(app)
+
+
+# --- Model serializers ---
+VARIANT = Serializer('variant', {
+    'url': attr('url'),
+    'width': attr('width'),
+    'height': attr('height'),
+    'type': attr('mimetype'),
+})
+
+IMAGE_VARIANTS = Serializer('image_variants', {
+    'url': attr('url'),
+    'width': attr('width'),
+    'height': attr('height'),
+    'srcset': nested('variants', VARIANT),
+})
+
+PROJECT = Serializer('project', {
+    'id': attr('id'),
+    'title': attr('title'),
+    'description': attr('description'),
+    'images': expr('[img.url for img in obj.images]'),
+    'image_variants': nested('images', IMAGE_VARIANTS),
+    'github_url': attr('github_url'),
+    'live_url': attr('live_url'),
+    'technologies': attr('technologies'),
+    'technologies_list': expr('_parse_list(obj.technologies)', _parse_list=parse_list),
+    'featured': attr('featured'),
+    'order': attr('order'),
+    'is_active': attr('is_active'),
+    'created_at': iso('created_at'),
+})
+
+PROFILE = Serializer('profile', {
+    'id': attr('id'),
+    'name': attr('name'),
+    'title': attr('title'),
+    'bio': attr('bio'),
+    'email': attr('email'),
+    'phone': attr('phone'),
+    'location': attr('location'),
+    'github': attr('github'),
+    'linkedin': attr('linkedin'),
+    'twitter': attr('twitter'),
+    'website': attr('website'),
+    'avatar': attr('avatar'),
+    'cv_url': attr('cv_url'),
+})
+
+CERTIFICATION = Serializer('certification', {
+    'id': attr('id'),
+    'title': attr('title'),
+    'institution': attr('institution'),
+    'description': attr('description'),
+    'date_awarded': iso('date_awarded'),
+    'order': attr('order'),
+    'is_active': attr('is_active'),
+    'certificate_url': attr('certificate_url'),
+})
+
+SKILL = Serializer('skill', {
+    'id': attr('id'),
+    'name': attr('name'),
+    'icon': attr('icon'),
+    'proficiency': attr('proficiency'),
+    'category': attr('category'),
+    'order': attr('order'),
+    'is_active': attr('is_active'),
+})
+
+REFERENCE = Serializer('reference', {
+    'id': attr('id'),
+    'name': attr('name'),
+    'email': attr('email'),
+    'phone': attr('phone'),
+    'note': attr('note'),
+})
+
+EXPERIENCE = Serializer('experience', {
+    'id': attr('id'),
+    'title': attr('title'),
+    'company': attr('company'),
+    'description': attr('description'),
+    'start_date': iso('start_date'),
+    'end_date': iso('end_date'),
+    'current': attr('current'),
+    'location': attr('location'),
+    'order': attr('order'),
+    'is_active': attr('is_active'),
+    'references': nested('references', REFERENCE),
+})
+
+EDUCATION = Serializer('education', {
+    'id': attr('id'),
+    'degree': attr('degree'),
+    'institution': attr('institution'),
+    'description': attr('description'),
+    'start_date': iso('start_date'),
+    'end_date': iso('end_date'),
+    'current': attr('current'),
+    'gpa': attr('gpa'),
+    'order': attr('order'),
+    'is_active': attr('is_active'),
+})
+
+CONTACT = Serializer('contact', {
+    'id': attr('id'),
+    'name': attr('name'),
+    'email': attr('email'),
+    'message': attr('message'),
+    'created_at': iso('created_at'),
+    'read': attr('read'),
+})
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import current_app
+
+from cache import response_cache
+from models import db, Project, Experience
+from storage import SIDECARS, upload_folder, url_to_relpath
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+UPLOAD_URL = re.compile(r'"(/api/uploads/[^"?#]+)"')
+
+# Public GET routes rendered into the snapshot: (endpoint, URL or a function
+# returning the URLs). Each file is rewritten only when a commit touches a
+# table its view reads (the view's response_cache tags) and its bytes changed.
+ROUTES = [
+    ('api.get_portfolio', '/api/portfolio'),
+    ('api.get_projects', '/api/projects'),
+    ('api.get_project', lambda: [f"/api/projects/{i}" for (i,) in db.session.query(Project.id)]),
+    ('api.get_technologies', '/api/technologies'),
+    ('api.profile', '/api/profile'),
+    ('api.get_skills', '/api/skills'),
+    ('api.get_experience', '/api/experience'),
+    ('api.get_references', lambda: [f"/api/experience/{i}/references" for (i,) in db.session.query(Experience.id)]),
+    ('api.get_education', '/api/education'),
+    ('api.certifications', '/api/certifications'),
+]
+
+
+def url_to_file(url):
+    # /api/projects -> api/projects.json; uploads keep their path so the CDN
+    # serves them under the same URL
+    path = url.lstrip('/')
+    return path if path.startswith('api/uploads/') else path + '.json'
+
+
+def route_tags(app, endpoint):
+    return getattr(app.view_functions[endpoint], 'cache_tags', None)
+
+
+def affected_routes(app, tables):
+    # Routes whose views read any of the tables; routes without tags always qualify
+    if tables is None:
+        return list(ROUTES)
+    return [(endpoint, urls) for endpoint, urls in ROUTES
+            if route_tags(app, endpoint) is None or route_tags(app, endpoint) & set(tables)]
+
+
+# --- Files ---
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def link_atomic(source, path):
+    # Blobs are immutable, so a hard link is as good as a copy; fall back to
+    # copying across filesystems
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def remove_file(out_dir, relpath):
+    path = os.path.join(out_dir, *relpath.split('/'))
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return
+    # Drop directories emptied by the removal
+    parent = os.path.dirname(path)
+    while parent != out_dir:
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break
+        parent = os.path.dirname(parent)
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'files': {}, 'uploads': {}}
+
+
+@contextmanager
+def export_lock(out_dir):
+    # One export at a time per directory, across processes
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, '.lock'), 'w') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# --- Export ---
+def export(out_dir, tables=None):
+    # Renders the routes affected by `tables` (all routes when None) through
+    # the app and rewrites only the files whose content hash changed. Runs in
+    # an app context. Returns counts of what changed.
+    app = current_app._get_current_object()
+    report = {'rendered': 0, 'written': 0, 'removed': 0, 'uploads_linked': 0, 'uploads_removed': 0}
+    routes = affected_routes(app, tables)
+    if not routes:
+        return report
+    with export_lock(out_dir):
+        manifest = load_manifest(out_dir)
+        files = dict(manifest['files'])
+        client = app.test_client()
+        for endpoint, urls in routes:
+            urls = urls() if callable(urls) else [urls]
+            # Listing ids ran on the writer; release it before rendering
+            db.session.remove()
+            # Files from this route that no longer exist (deleted rows) go away
+            stale = {url for url, entry in files.items() if entry['endpoint'] == endpoint} - set(urls)
+            for url in urls:
+                response = client.get(url)
+                report['rendered'] += 1
+                if response.status_code != 200:
+                    stale.add(url)
+                    continue
+                body = response.get_data()
+                digest = hashlib.sha256(body).hexdigest()
+                entry = files.get(url)
+                relpath = url_to_file(url)
+                if entry is None or entry['sha256'] != digest or not os.path.exists(os.path.join(out_dir, relpath)):
+                    write_atomic(os.path.join(out_dir, *relpath.split('/')), body)
+                    report['written'] += 1
+                files[url] = {'endpoint': endpoint, 'path': relpath, 'sha256': digest, 'bytes': len(body),
+                              'uploads': sorted(set(UPLOAD_URL.findall(body.decode())))}
+            for url in stale:
+                if url in files:
+                    remove_file(out_dir, files.pop(url)['path'])
+                    report['removed'] += 1
+        uploads = sync_uploads(out_dir, files, manifest['uploads'], report)
+        # generated_at only moves when the snapshot's content did
+        if (files != manifest['files'] or uploads != manifest['uploads']
+                or not os.path.exists(os.path.join(out_dir, MANIFEST))):
+            manifest = {'generated_at': datetime.utcnow().isoformat() + 'Z', 'files': files, 'uploads': uploads}
+            write_atomic(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return report
+
+
+def sync_uploads(out_dir, files, previous, report):
+    # Links every upload the rendered files point at (with its precompressed
+    # sidecars) and removes the ones nothing points at any more
+    folder = upload_folder()
+    wanted = {url for entry in files.values() for url in entry['uploads']}
+    uploads = {}
+    for url in sorted(wanted):
+        relpath = url_to_relpath(url)
+        source = os.path.join(folder, *relpath.split('/'))
+        if not os.path.isfile(source):
+            continue
+        suffixes = [''] + [suffix for _, suffix in SIDECARS if os.path.isfile(source + suffix)]
+        paths = [url_to_file(url) + suffix for suffix in suffixes]
+        for suffix, path in zip(suffixes, paths):
+            target = os.path.join(out_dir, *path.split('/'))
+            if not os.path.exists(target):
+                link_atomic(source + suffix, target)
+                report['uploads_linked'] += 1
+        uploads[url] = paths
+    for url, paths in previous.items():
+        if url not in uploads:
+            for path in paths:
+                remove_file(out_dir, path)
+            report['uploads_removed'] += 1
+    return uploads
+
+
+# Re-exports the affected routes shortly after admin writes. Commits report
+# their tables through the response cache's invalidation listeners; a
+# background thread waits SNAPSHOT_DELAY seconds so a burst of writes costs
+# one export.
+class SnapshotExporter:
+
+    def __init__(self, app=None):
+        self._cond = threading.Condition()
+        self._pending = set()
+        self._thread = None
+        self._pid = None
+        self.app = None
+        self.out_dir = None
+        self.auto = False
+        self.delay = 2.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.out_dir = app.config.get('SNAPSHOT_DIR')
+        self.auto = bool(self.out_dir) and app.config.get('SNAPSHOT_AUTO', False)
+        self.delay = app.config.get('SNAPSHOT_DELAY', self.delay)
+        app.extensions['snapshot'] = self
+        if self.auto and self.on_invalidate not in response_cache.listeners:
+            response_cache.listeners.append(self.on_invalidate)
+
+    def on_invalidate(self, tables):
+        # Runs inside the committing request: only records the tables. Writes
+        # no exported route reads (contacts, logins) never wake the exporter.
+        if not affected_routes(self.app, tables):
+            return
+        self._ensure_worker()
+        with self._cond:
+            self._pending.update(tables)
+            self._cond.notify()
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork, so a worker starts its own on first use
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pending.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='snapshot-export', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.delay)
+            with self._cond:
+                tables, self._pending = self._pending, set()
+            try:
+                with self.app.app_context():
+                    report = export(self.out_dir, tables)
+                logger.info('Snapshot updated for %s: %d written, %d removed',
+                            ', '.join(sorted(tables)), report['written'], report['removed'])
+            except Exception:
+                logger.exception('Snapshot export failed')
+
+
+snapshot_exporter = SnapshotExporter()
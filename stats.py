@@ -0,0 +1,97 @@
+from collections import Counter
+
+from sqlalchemy import event, extract, func
+from sqlalchemy.orm import Session
+
+from models import db, Project, Skill, Education, Certification, Contact, StatBucket
+
+TOTAL = 'total'
+# Tables counted on /api/stats; those with a created_at column are also bucketed by month
+TRACKED = (Project, Skill, Education, Certification, Contact)
+
+
+def month_of(value):
+    return value.strftime('%Y-%m') if value else None
+
+
+def apply_deltas(connection, deltas):
+    table = StatBucket.__table__
+    for (metric, bucket), delta in deltas.items():
+        if not delta:
+            continue
+        result = connection.execute(
+            table.update()
+            .where(table.c.metric == metric, table.c.bucket == bucket)
+            .values(count=table.c.count + delta)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(metric=metric, bucket=bucket, count=delta))
+
+
+def _deltas_for(objects, sign, deltas):
+    for obj in objects:
+        if not isinstance(obj, TRACKED):
+            continue
+        metric = obj.__tablename__
+        deltas[(metric, TOTAL)] += sign
+        month = month_of(getattr(obj, 'created_at', None))
+        if month:
+            deltas[(metric, month)] += sign
+
+
+@event.listens_for(Session, 'before_flush')
+def _count_deletes(session, flush_context, instances):
+    # Read created_at while the rows still exist
+    _deltas_for(session.deleted, -1, session.info.setdefault('stat_deltas', Counter()))
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_writes(session, flush_context):
+    # Runs inside the writing transaction, so counters commit or roll back with
+    # the rows; new objects are counted here once created_at defaults are set
+    deltas = session.info.pop('stat_deltas', Counter())
+    _deltas_for(session.new, 1, deltas)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_deltas(session):
+    session.info.pop('stat_deltas', None)
+
+
+def rebuild():
+    deltas = Counter()
+    for model in TRACKED:
+        metric = model.__tablename__
+        deltas[(metric, TOTAL)] = db.session.query(func.count(model.id)).scalar()
+        created_at = getattr(model, 'created_at', None)
+        if created_at is None:
+            continue
+        # extract() compiles per dialect (strftime on SQLite, EXTRACT elsewhere)
+        year, month = extract('year', created_at), extract('month', created_at)
+        for y, m, count in (db.session.query(year, month, func.count(model.id))
+                            .filter(created_at.isnot(None)).group_by(year, month)):
+            deltas[(metric, f"{int(y):04d}-{int(m):02d}")] = count
+    db.session.query(StatBucket).delete()
+    db.session.add_all(StatBucket(metric=metric, bucket=bucket, count=count)
+                       for (metric, bucket), count in deltas.items() if count)
+    db.session.commit()
+    return deltas
+
+
+def ensure_counters():
+    # First boot after the upgrade: seed counters from the existing rows
+    if StatBucket.query.first() is None and any(model.query.first() is not None for model in TRACKED):
+        rebuild()
+
+
+def snapshot():
+    totals = {}
+    months = {}
+    for row in StatBucket.query.order_by(StatBucket.metric, StatBucket.bucket):
+        if row.bucket == TOTAL:
+            totals[row.metric] = row.count
+        elif row.count:
+            months.setdefault(row.metric, []).append({'month': row.bucket, 'count': row.count})
+    return totals, months
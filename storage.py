@@ -0,0 +1,539 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Request, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import NotFound, RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename, send_file
+
+from jobs import enqueue, handler
+from metrics import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+UPLOAD_URL_PREFIX = '/api/uploads/'
+CHUNK_SIZE = 64 * 1024
+TMP_DIR = '.tmp'
+
+logger = logging.getLogger(__name__)
+
+
+# --- Paths ---
+def upload_folder():
+    return current_app.config['UPLOAD_FOLDER']
+
+
+def url_to_relpath(url):
+    if not url or not url.startswith(UPLOAD_URL_PREFIX):
+        return None
+    return url[len(UPLOAD_URL_PREFIX):]
+
+
+def url_to_path(url):
+    relpath = url_to_relpath(url)
+    return os.path.join(upload_folder(), *relpath.split('/')) if relpath else None
+
+
+def relpath_to_url(relpath):
+    return UPLOAD_URL_PREFIX + relpath.replace(os.sep, '/')
+
+
+def blob_relpath(digest, ext):
+    # Two levels of 256-way sharding keep directories small
+    return '/'.join((digest[:2], digest[2:4], digest + ext))
+
+
+def file_extension(filename):
+    _, ext = os.path.splitext(secure_filename(filename or ''))
+    return ext.lower()
+
+
+# --- Type sniffing ---
+SNIFF_BYTES = 512
+# Raster formats get responsive variants; SVGs are served as uploaded
+RASTER_TYPES = frozenset({'image/jpeg', 'image/png', 'image/gif', 'image/webp'})
+IMAGE_TYPES = RASTER_TYPES | {'image/svg+xml'}
+DOCUMENT_TYPES = frozenset({'application/pdf'})
+UPLOAD_TYPES = IMAGE_TYPES | DOCUMENT_TYPES
+EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/svg+xml': '.svg',
+    'application/pdf': '.pdf',
+}
+
+
+def sniff_mimetype(head):
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head.startswith(b'%PDF-'):
+        return 'application/pdf'
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n')
+    if (text.startswith(b'<?xml') or text.startswith(b'<svg')) and b'<svg' in head:
+        return 'image/svg+xml'
+    return None
+
+
+# --- Streaming ingestion ---
+class IngestFile:
+    # Multipart file parts are spooled straight into the upload temp dir.
+    # Size and type are checked and the content hashed while werkzeug is
+    # still reading the body, so a bad upload stops the parse early.
+
+    def __init__(self, folder, max_size):
+        tmp_dir = os.path.join(folder, TMP_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=tmp_dir)
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self._head = b''
+        self.max_size = max_size
+        self.size = 0
+        self.mimetype = None
+        self.done = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise RequestEntityTooLarge(f'Each file must be at most {self.max_size} bytes')
+        if self.mimetype is None and len(self._head) < SNIFF_BYTES:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= SNIFF_BYTES:
+                self.sniff(UPLOAD_TYPES)
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def sniff(self, allowed):
+        if self.mimetype is None:
+            self.mimetype = sniff_mimetype(self._head)
+        if self.mimetype not in allowed:
+            raise UnsupportedMediaType('Unsupported file type')
+        return self.mimetype
+
+    @property
+    def digest(self):
+        return self._hash.hexdigest()
+
+    def discard(self):
+        self.done = True
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        stream = IngestFile(current_app.config['UPLOAD_FOLDER'], current_app.config['MAX_UPLOAD_FILE_SIZE'])
+        g.setdefault('ingest_files', []).append(stream)
+        return stream
+
+
+def _finalize(folder, stream):
+    stream.flush()
+    os.fsync(stream.fileno())
+    stream.close()
+    stream.done = True
+    return commit_blob(folder, stream.path, stream.digest, EXTENSIONS[stream.mimetype])
+
+
+def _write_pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=current_app.config['UPLOAD_WRITE_WORKERS'],
+                                           thread_name_prefix='upload-write')
+        return _executor
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _reset_write_pool():
+    # Worker threads do not survive a fork; the child starts its own pool
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_write_pool)
+
+
+def save_uploads(files, allowed=UPLOAD_TYPES):
+    # Every file is validated before any of them is moved into place, then the
+    # fsync + rename of each runs concurrently
+    start = time.perf_counter()
+    folder = upload_folder()
+    streams = []
+    for file in files:
+        stream = file.stream
+        if not isinstance(stream, IngestFile):
+            stream = spool(file.stream, folder, current_app.config['MAX_UPLOAD_FILE_SIZE'])
+            g.setdefault('ingest_files', []).append(stream)
+        stream.sniff(allowed)
+        streams.append(stream)
+    futures = [_write_pool().submit(_finalize, folder, stream) for stream in streams]
+    results = []
+    error = None
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            error = error or e
+    # Registered before raising, so the blobs the other files already moved
+    # into place are removed along with the failed request's
+    new_blobs = g.setdefault('new_blobs', [])
+    new_blobs.extend(path for _, path, created in results if created)
+    if error is not None:
+        raise error
+    metrics.observe_upload(len(streams), sum(s.size for s in streams), time.perf_counter() - start)
+    # Sidecars are written after the request commits, off the request path
+    for url, path, created in results:
+        if created and os.path.splitext(path)[1] in COMPRESSIBLE_EXTENSIONS:
+            relpath = url_to_relpath(url)
+            enqueue('precompress', {'relpath': relpath}, key=f"precompress:{relpath}")
+    return [url for url, _, _ in results]
+
+
+def save_upload(file, allowed=UPLOAD_TYPES):
+    return save_uploads([file], allowed)[0]
+
+
+def spool(source, folder, max_size):
+    stream = IngestFile(folder, max_size)
+    try:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            stream.write(chunk)
+    except BaseException:
+        stream.discard()
+        raise
+    return stream
+
+
+def store_stream(source, ext):
+    # Unchecked ingestion for trusted files (e.g. migrations)
+    folder = upload_folder()
+    stream = spool(source, folder, float('inf'))
+    stream.flush()
+    stream.close()
+    stream.done = True
+    url, path, created = commit_blob(folder, stream.path, stream.digest, ext)
+    if created and ext in COMPRESSIBLE_EXTENSIONS:
+        precompress(path)
+    return url
+
+
+def commit_blob(folder, tmp_path, digest, ext):
+    relpath = blob_relpath(digest, ext)
+    path = os.path.join(folder, *relpath.split('/'))
+    if os.path.exists(path):
+        # Identical content is already stored; refresh mtime so a concurrent
+        # GC pass treats it as recently written
+        os.remove(tmp_path)
+        os.utime(path)
+        return relpath_to_url(relpath), path, False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+    return relpath_to_url(relpath), path, True
+
+
+# --- Precompressed sidecars ---
+COMPRESSIBLE_EXTENSIONS = frozenset({'.svg', '.pdf'})
+SIDECARS = (('br', '.br'), ('gzip', '.gz'))
+MIN_SAVING = 0.1
+
+
+def precompress(path):
+    # Writes <path>.gz (and <path>.br when brotli is installed), keeping only
+    # sidecars that are meaningfully smaller than the original
+    with open(path, 'rb') as f:
+        data = f.read()
+    encoders = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append(('.br', lambda d: brotli.compress(d, quality=11)))
+    written = []
+    for suffix, encode in encoders:
+        encoded = encode(data)
+        if len(encoded) > len(data) * (1 - MIN_SAVING):
+            continue
+        tmp_path = f"{path}{suffix}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as out:
+            out.write(encoded)
+        os.replace(tmp_path, path + suffix)
+        written.append(path + suffix)
+    return written
+
+
+@handler('precompress')
+def precompress_upload(relpath):
+    path = os.path.join(upload_folder(), *relpath.split('/'))
+    # Collected as an orphan before the job ran
+    if os.path.isfile(path):
+        precompress(path)
+
+
+def sidecar_base(relpath):
+    for _, suffix in SIDECARS:
+        if relpath.endswith(suffix):
+            return relpath[:-len(suffix)]
+    return None
+
+
+# --- Serving ---
+def send_upload(relpath):
+    folder = upload_folder()
+    path = safe_join(folder, relpath)
+    if path is None or relpath.startswith(TMP_DIR + '/') or not os.path.isfile(path):
+        raise NotFound()
+    config = current_app.config
+    # Blob names are content hashes (variants derive from them), so a URL
+    # always maps to the same bytes and the stem makes a strong validator
+    stem = os.path.splitext(os.path.basename(path))[0]
+    etag = stem if '/' in relpath else True
+    mimetype = None
+    encoding = None
+    _, ext = os.path.splitext(path)
+    if ext in COMPRESSIBLE_EXTENSIONS:
+        for name, suffix in SIDECARS:
+            if name in request.accept_encodings and os.path.isfile(path + suffix):
+                mimetype = send_file_mimetype(path)
+                encoding, path, relpath = name, path + suffix, relpath + suffix
+                if etag is not True:
+                    etag = f"{etag}-{suffix[1:]}"
+                break
+    mode = config['UPLOAD_OFFLOAD']
+    if mode == 'x-accel-redirect':
+        response = current_app.response_class(mimetype=mimetype or send_file_mimetype(path))
+        response.headers['X-Accel-Redirect'] = config['UPLOAD_ACCEL_PREFIX'].rstrip('/') + '/' + relpath
+        if etag is not True:
+            response.set_etag(etag)
+    else:
+        response = send_file(path, request.environ, mimetype=mimetype, etag=etag, conditional=True,
+                             max_age=config['UPLOAD_CACHE_MAX_AGE'], use_x_sendfile=mode == 'x-sendfile',
+                             response_class=current_app.response_class)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if ext in COMPRESSIBLE_EXTENSIONS:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = config['UPLOAD_CACHE_MAX_AGE']
+    response.cache_control.immutable = True
+    return response
+
+
+def send_file_mimetype(path):
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+@event.listens_for(Session, 'after_commit')
+def _keep_committed_blobs(session):
+    # The rows pointing at this request's new blobs are stored: keep them
+    if has_request_context():
+        g.pop('new_blobs', None)
+
+
+def cleanup_request_files(exc=None):
+    # Temp files never finalized are always removed, and so are blobs this
+    # request created but never committed rows for: it raised, aborted or
+    # rolled back after a handled error
+    for stream in g.pop('ingest_files', []):
+        if not stream.done:
+            stream.discard()
+    for path in g.pop('new_blobs', []):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def init_app(app):
+    app.request_class = UploadRequest
+    app.teardown_request(cleanup_request_files)
+
+
+# --- Reference tracking and GC ---
+def upload_references():
+    # Every column that may hold an /api/uploads/ URL. Anything on disk that
+    # none of these point at is garbage.
+    from models import Profile, ProjectImage, ProjectImageVariant, Certification
+    return [
+        (ProjectImage, ProjectImage.url),
+        (ProjectImageVariant, ProjectImageVariant.url),
+        (Profile, Profile.cv_url),
+        (Profile, Profile.avatar),
+        (Certification, Certification.certificate_url),
+    ]
+
+
+def referenced_relpaths():
+    from models import db
+    live = set()
+    for _, column in upload_references():
+        for (url,) in db.session.query(column).filter(column.like(UPLOAD_URL_PREFIX + '%')):
+            live.add(url_to_relpath(url))
+    return live
+
+
+def iter_stored_files():
+    folder = upload_folder()
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, folder).replace(os.sep, '/'), path
+
+
+def collect_garbage(grace_seconds=3600, dry_run=False):
+    # Files younger than grace_seconds are kept: they may belong to a request
+    # that has written its upload but not committed the row yet.
+    live = referenced_relpaths()
+    cutoff = time.time() - grace_seconds
+    report = {'live_files': 0, 'live_bytes': 0, 'orphan_files': 0, 'orphan_bytes': 0,
+              'deleted_files': 0, 'deleted_bytes': 0}
+    found = set()
+    for relpath, path in iter_stored_files():
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if relpath in live or sidecar_base(relpath) in live:
+            found.add(relpath)
+            report['live_files'] += 1
+            report['live_bytes'] += stat.st_size
+            continue
+        report['orphan_files'] += 1
+        report['orphan_bytes'] += stat.st_size
+        if dry_run or stat.st_mtime > cutoff:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        report['deleted_files'] += 1
+        report['deleted_bytes'] += stat.st_size
+    report['missing'] = sorted(live - found)
+    return report
+
+
+def scheduled_gc(app):
+    # One pass per interval across every process on this host: a pass holds
+    # the lock file and records when it ran there. Returns None when another
+    # process is collecting or collected recently.
+    interval = app.config['UPLOAD_GC_INTERVAL']
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(os.path.join(app.instance_path, 'uploads-gc.lock'), 'a+') as f:
+        if fcntl is not None:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+        try:
+            f.seek(0)
+            last_run = float(f.read() or 0)
+            # Half an interval of slack, as the processes' timers drift apart
+            if time.time() - last_run < interval / 2:
+                return None
+            report = collect_garbage(app.config['UPLOAD_GC_GRACE'])
+            f.truncate(0)
+            f.write(str(time.time()))
+            return report
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def start_gc_scheduler(app):
+    # The thread starts on a worker's first request, never in CLI commands or
+    # in a preloading server's master; `flask uploads-gc` from cron works
+    # with UPLOAD_GC_INTERVAL=0 instead
+    if app.config['UPLOAD_GC_INTERVAL'] <= 0:
+        return
+    app.before_request(lambda: _ensure_gc_thread(app))
+
+
+_gc_pid = None
+_gc_lock = threading.Lock()
+
+
+def _ensure_gc_thread(app):
+    global _gc_pid
+    if _gc_pid == os.getpid():
+        return
+    with _gc_lock:
+        if _gc_pid == os.getpid():
+            return
+        _gc_pid = os.getpid()
+    threading.Thread(target=_run_gc, args=(app,), name='upload-gc', daemon=True).start()
+
+
+def _run_gc(app):
+    while True:
+        time.sleep(app.config['UPLOAD_GC_INTERVAL'])
+        with app.app_context():
+            try:
+                report = scheduled_gc(app)
+            except Exception:
+                logger.exception('Upload GC failed')
+                continue
+        if report is not None:
+            logger.info('Upload GC reclaimed %d files (%d bytes); %d live files (%d bytes)',
+                        report['deleted_files'], report['deleted_bytes'],
+                        report['live_files'], report['live_bytes'])
+
+
+# --- Legacy layout migration ---
+def migrate_legacy_uploads():
+    # Moves flat timestamped uploads into the content-addressed layout and
+    # rewrites the URLs pointing at them; duplicates collapse to one blob.
+    from models import db
+    migrated = {}
+    rows = 0
+    for model, column in upload_references():
+        for obj in model.query.filter(column.like(UPLOAD_URL_PREFIX + '%')):
+            url = getattr(obj, column.key)
+            relpath = url_to_relpath(url)
+            if '/' in relpath:
+                continue
+            if url not in migrated:
+                path = url_to_path(url)
+                if not os.path.exists(path):
+                    continue
+                with open(path, 'rb') as f:
+                    migrated[url] = store_stream(f, file_extension(relpath))
+            setattr(obj, column.key, migrated[url])
+            rows += 1
+    db.session.commit()
+    return rows, len(migrated)
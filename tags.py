@@ -0,0 +1,94 @@
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from models import db, Project, Technology, project_technology
+from serializers import parse_list
+
+MAX_NAME_LENGTH = 100
+
+
+def slugify(name):
+    return ' '.join(name.lower().split())[:MAX_NAME_LENGTH]
+
+
+def technology_names(value):
+    # Distinct names from a technologies string, first spelling wins
+    names = {}
+    for item in parse_list(value):
+        name = ' '.join(str(item).split())[:MAX_NAME_LENGTH]
+        if name:
+            names.setdefault(slugify(name), name)
+    return names
+
+
+def resolve(session, names, pending):
+    # Maps slugs to Technology rows, creating missing ones; `pending` shares
+    # rows created earlier in the same flush
+    missing = [slug for slug in names if slug not in pending]
+    if missing:
+        with session.no_autoflush:
+            for tech in session.query(Technology).filter(Technology.slug.in_(missing)):
+                pending[tech.slug] = tech
+    for slug, name in names.items():
+        if slug not in pending:
+            pending[slug] = Technology(name=name, slug=slug)
+    return [pending[slug] for slug in names]
+
+
+def sync(session, projects):
+    pending = {}
+    for project in projects:
+        project.tags = resolve(session, technology_names(project.technologies), pending)
+
+
+@event.listens_for(Session, 'before_flush')
+def _sync_tags(session, flush_context, instances):
+    changed = [obj for obj in list(session.new) + list(session.dirty)
+               if isinstance(obj, Project) and inspect(obj).attrs.technologies.history.has_changes()]
+    if changed:
+        sync(session, changed)
+
+
+# --- Backfill ---
+def rebuild():
+    # Re-derives every project's tags and drops technologies nothing uses
+    projects = Project.query.all()
+    sync(db.session, projects)
+    db.session.flush()
+    used = select(project_technology.c.technology_id)
+    db.session.query(Technology).filter(Technology.id.not_in(used)).delete(synchronize_session=False)
+    db.session.commit()
+    return len(projects)
+
+
+def ensure_tags():
+    # First boot after the upgrade: parse the existing technologies strings
+    has_links = db.session.execute(select(project_technology.c.project_id).limit(1)).first() is not None
+    if not has_links and Project.query.filter(Project.technologies.isnot(None)).first() is not None:
+        rebuild()
+
+
+# --- Queries ---
+def projects_with_all(slugs):
+    # Ids of projects tagged with every slug
+    slugs = sorted({slugify(s) for s in slugs if s.strip()})
+    return (select(project_technology.c.project_id)
+            .join(Technology, Technology.id == project_technology.c.technology_id)
+            .where(Technology.slug.in_(slugs))
+            .group_by(project_technology.c.project_id)
+            .having(func.count() == len(slugs)))
+
+
+def counts_statement(include_inactive=False):
+    count = func.count(project_technology.c.project_id)
+    statement = (select(Technology.name, Technology.slug, count)
+                 .join(project_technology, project_technology.c.technology_id == Technology.id)
+                 .join(Project, Project.id == project_technology.c.project_id))
+    if not include_inactive:
+        statement = statement.where(Project.is_active == True)
+    return statement.group_by(Technology.id).order_by(count.desc(), Technology.name)
+
+
+def counts(include_inactive=False):
+    rows = db.session.execute(counts_statement(include_inactive))
+    return [{'name': name, 'slug': slug, 'count': n} for name, slug, n in rows]
@@ -0,0 +1,66 @@
+import os
+import shutil
+import sys
+import threading
+
+import pytest
+from sqlalchemy import event
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from bench.seed import ADMIN_PASSWORD, ADMIN_USERNAME, prepare_workdir, seed  # noqa: E402
+
+# Config is read from the environment when the app modules are first
+# imported, so the test database is set up before any test module loads
+WORKDIR, _ = prepare_workdir(None)
+# Rows seeded once per session, enough to exercise every list and index
+SIZES = dict(projects=10, images=2, experience=5, references=2, skills=10,
+             education=2, certifications=3, contacts=200)
+os.environ.update({
+    'JOB_WORKERS': '0',
+    'RESPONSE_CACHE_STAMP_DIR': os.path.join(WORKDIR, 'cache-stamps'),
+})
+
+
+@pytest.fixture(scope='session')
+def app():
+    # One app per session: the extensions are module-level singletons
+    from __init__ import create_app
+    app = create_app()
+    with app.app_context():
+        seed(SIZES)
+    yield app
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_queries(app):
+    # Returns a callable giving the SQL statements run by this thread so far
+    from models import db
+    thread = threading.get_ident()
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        # BEGIN comes from the engine profile, not from the code under test
+        if threading.get_ident() == thread and not statement.startswith('BEGIN'):
+            statements.append(statement)
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', record)
+    yield lambda: len(statements)
+    for engine in engines:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def admin_headers(client):
+    response = client.post('/api/admin/login', json={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
@@ -0,0 +1,21 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+import database
+from database import insert_ignore
+from models import db, RevokedToken, User
+
+
+@pytest.mark.parametrize('on_conflict', [True, False], ids=['on-conflict', 'lookup'])
+def test_insert_ignore_inserts_each_key_once(app, monkeypatch, on_conflict):
+    if not on_conflict:
+        monkeypatch.setattr(database, 'UPSERT_DIALECTS', {})
+    table = RevokedToken.__table__
+    with app.app_context():
+        values = {'jti': uuid.uuid4().hex, 'user_id': User.query.first().id, 'expires_at': datetime.utcnow()}
+        assert insert_ignore(db, table, values, 'jti')
+        assert not insert_ignore(db, table, values, 'jti')
+        db.session.commit()
+        assert db.session.query(table).filter_by(jti=values['jti']).count() == 1
@@ -0,0 +1,26 @@
+from io import BytesIO
+
+from bench.seed import PNG_1X1
+from images import generate_variants
+from models import db, Job, ProjectImage
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg" width="1" height="1"/>'
+
+
+def test_variants_are_queued_for_raster_images_only(app, client, admin_headers, monkeypatch):
+    monkeypatch.setitem(app.config, 'IMAGE_VARIANTS_ENABLED', True)
+    response = client.post('/api/projects', headers=admin_headers, data={
+        'title': 'Vector and raster', 'description': 'Mixed images',
+        'images': [(BytesIO(PNG_1X1), 'pixel.png', 'image/png'), (BytesIO(SVG), 'logo.svg', 'image/svg+xml')],
+    })
+    assert response.status_code == 201
+    with app.app_context():
+        images = ProjectImage.query.filter_by(project_id=response.get_json()['id']).order_by(ProjectImage.order).all()
+        queued = {job.key for job in Job.query.filter_by(type='image_variants')}
+    assert [image.url.rsplit('.', 1)[1] for image in images] == ['png', 'svg']
+    assert f"image_variants:{images[0].id}" in queued
+    assert f"image_variants:{images[1].id}" not in queued
+    with app.app_context():
+        # A backfill or a job queued before the filter skips the SVG
+        generate_variants(images[1].id)
+        assert not db.session.get(ProjectImage, images[1].id).variants
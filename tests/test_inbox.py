@@ -0,0 +1,20 @@
+import pytest
+
+from inbox import contact_inbox, max_streams
+
+
+@pytest.mark.parametrize('threads, share, expected', [
+    (8, 0.25, 2),
+    (4, 1.0, 3),
+    # A sync worker has no thread to spare
+    (1, 0.25, 0),
+])
+def test_streams_leave_threads_for_other_requests(threads, share, expected):
+    assert max_streams(threads, share) == expected
+
+
+def test_streams_beyond_the_cap_get_503(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(contact_inbox, 'max_clients', contact_inbox.subscribers)
+    response = client.get('/api/contacts/events', headers=admin_headers)
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
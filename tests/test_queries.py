@@ -0,0 +1,37 @@
+from datetime import date
+
+import pytest
+
+from cache import response_cache
+from models import db, Experience, Project, ProjectImage, Reference
+
+
+def add_rows(app, count):
+    with app.app_context():
+        for i in range(count):
+            project = Project(title=f'Project {i}', description='Test project', technologies='[]', order=i)
+            project.images = [ProjectImage(url=f'/api/uploads/test/{i}-{n}.png', order=n) for n in range(2)]
+            experience = Experience(title='Engineer', company=f'Company {i}', description='Test experience',
+                                    start_date=date(2020, 1, 1), order=i)
+            experience.references = [Reference(name=f'Reference {n}') for n in range(2)]
+            db.session.add_all([project, experience])
+        db.session.commit()
+
+
+def queries_for(client, count_queries, path):
+    before = count_queries()
+    response = client.get(path)
+    assert response.status_code == 200
+    return count_queries() - before, len(response.get_json())
+
+
+@pytest.mark.parametrize('path', ['/api/projects', '/api/experience'])
+def test_list_queries_do_not_grow_with_rows(app, client, count_queries, monkeypatch, path):
+    # Every request must reach the database
+    monkeypatch.setattr(response_cache, 'enabled', False)
+    add_rows(app, 3)
+    few, few_rows = queries_for(client, count_queries, path)
+    add_rows(app, 12)
+    many, many_rows = queries_for(client, count_queries, path)
+    assert many_rows > few_rows
+    assert many == few
@@ -0,0 +1,9 @@
+import schema
+
+
+def test_hot_queries_use_indexes(app):
+    with app.app_context():
+        results = schema.check_query_plans()
+    assert results
+    problems = {name: (problems, plan) for name, plan, problems in results if problems}
+    assert not problems
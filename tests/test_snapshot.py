@@ -0,0 +1,29 @@
+import json
+
+import snapshot
+from snapshot import SnapshotExporter, export
+
+
+def read_manifest(out_dir):
+    with open(out_dir / snapshot.MANIFEST) as f:
+        return json.load(f)
+
+
+def test_export_rewrites_nothing_without_changes(app, tmp_path):
+    with app.app_context():
+        report = export(str(tmp_path))
+        assert report['written'] > 0
+        manifest = read_manifest(tmp_path)
+        # Commits touching only tables no exported route reads
+        assert not any(export(str(tmp_path), {'contact', 'user', 'revoked_token'}).values())
+        # A commit to an exported table that left every response the same
+        report = export(str(tmp_path), {'skill'})
+        assert report['rendered'] and not report['written']
+    assert read_manifest(tmp_path) == manifest
+
+
+def test_unrelated_commits_do_not_wake_the_exporter(app):
+    exporter = SnapshotExporter()
+    exporter.app = app
+    exporter.on_invalidate({'contact', 'revoked_token'})
+    assert exporter._thread is None and not exporter._pending
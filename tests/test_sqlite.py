@@ -0,0 +1,59 @@
+import re
+import sqlite3
+from io import BytesIO
+
+from sqlalchemy.engine import make_url
+from werkzeug.test import EnvironBuilder
+
+from auth import token_cache
+from bench.seed import PNG_1X1
+
+
+def test_readers_and_writer_never_hit_a_lock(app):
+    result = app.test_cli_runner().invoke(args=['sqlite-stress', '--readers', '8', '--seconds', '2'])
+    assert 'database is locked' not in result.output
+    assert result.exit_code == 0, result.output
+    reads, writes, errors = map(int, re.match(r'(\d+) reads .*, (\d+) writes .*, (\d+) errors', result.output).groups())
+    assert reads and writes
+    assert errors == 0
+
+
+class LockProbe(BytesIO):
+    # Request body that checks, while the view reads it, whether another
+    # connection could take the database write lock
+    def __init__(self, body, database):
+        super().__init__(body)
+        self.database = database
+        self.locked = []
+
+    def probe(self):
+        conn = sqlite3.connect(self.database, timeout=0)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.rollback()
+            self.locked.append(False)
+        except sqlite3.OperationalError:
+            self.locked.append(True)
+        finally:
+            conn.close()
+
+    def read(self, *args):
+        self.probe()
+        return super().read(*args)
+
+    def readinto(self, buffer):
+        self.probe()
+        return super().readinto(buffer)
+
+
+def test_uploads_stream_in_without_the_write_lock(app, client, admin_headers):
+    # Drops the cached principal so authentication queries the database
+    token_cache.clear()
+    environ = EnvironBuilder(method='PUT', data={'title': 'Renamed', 'images': [(BytesIO(PNG_1X1), 'pixel.png')]}
+                             ).get_environ()
+    body = environ['wsgi.input'].read()
+    probe = LockProbe(body, make_url(app.config['SQLALCHEMY_DATABASE_URI']).database)
+    response = client.put('/api/projects/1', headers=admin_headers, input_stream=probe,
+                          content_type=environ['CONTENT_TYPE'], content_length=len(body))
+    assert response.status_code == 200
+    assert probe.locked and not any(probe.locked)
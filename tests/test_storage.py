@@ -0,0 +1,70 @@
+import fcntl
+import os
+from io import BytesIO
+
+import pytest
+from flask import g
+from werkzeug.datastructures import FileStorage
+
+import storage
+from bench.seed import PNG_1X1
+from models import db
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg" width="1" height="1"/>'
+
+
+def upload(content, filename):
+    return FileStorage(BytesIO(content), filename)
+
+
+def test_blobs_are_kept_once_committed(app):
+    content = PNG_1X1 + b'committed'
+    with app.test_request_context(method='POST'):
+        url = storage.save_upload(upload(content, 'kept.png'))
+        db.session.commit()
+        path = storage.url_to_path(url)
+    assert os.path.exists(path)
+
+
+def test_uncommitted_blobs_are_removed(app):
+    # A handled error (4xx, caught IntegrityError) returns without committing
+    content = PNG_1X1 + b'handled error'
+    with app.test_request_context(method='POST'):
+        path = storage.url_to_path(storage.save_upload(upload(content, 'dropped.png')))
+        assert os.path.exists(path)
+    assert not os.path.exists(path)
+
+
+def test_failed_write_removes_the_blobs_already_stored(app, monkeypatch):
+    finalize = storage._finalize
+
+    def fail_svg(folder, stream):
+        if stream.mimetype == 'image/svg+xml':
+            raise OSError('disk full')
+        return finalize(folder, stream)
+
+    monkeypatch.setattr(storage, '_finalize', fail_svg)
+    content = PNG_1X1 + b'partial batch'
+    with app.test_request_context(method='POST'):
+        with pytest.raises(OSError):
+            storage.save_uploads([upload(content, 'first.png'), upload(SVG, 'second.svg')])
+        created = list(g.new_blobs)
+    assert created
+    assert not any(os.path.exists(path) for path in created)
+
+
+def test_scheduled_gc_runs_once_per_interval(app, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'instance_path', str(tmp_path))
+    monkeypatch.setitem(app.config, 'UPLOAD_GC_INTERVAL', 3600)
+    with app.app_context():
+        assert storage.scheduled_gc(app) is not None
+        # Another process collected moments ago
+        assert storage.scheduled_gc(app) is None
+
+
+def test_scheduled_gc_skips_while_another_process_collects(app, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'instance_path', str(tmp_path))
+    with open(tmp_path / 'uploads-gc.lock', 'w') as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        with app.app_context():
+            assert storage.scheduled_gc(app) is None